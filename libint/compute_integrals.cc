@@ -16,6 +16,7 @@ using libint2::Atom;
 using libint2::BasisSet;
 using libint2::Operator;
 using libint2::Shell;
+using namd::Coordinates;
 using namd::CP2K_Basis_Atom;
 using namd::map_elements;
 using namd::Matrix;
@@ -27,6 +28,47 @@ std::vector<Atom> read_xyz_from_file(const string &path_xyz) {
   return libint2::read_dotxyz(input_file);
 }
 
+/**
+ * \brief Get the atomic number of the element `symbol`.
+ */
+int get_atomic_number(const string &symbol) {
+  // Map from symbol to atomic_number, inverse of map_elements
+  static const std::unordered_map<string, int> map_symbols = [] {
+    std::unordered_map<string, int> dict;
+    for (const auto &kv : map_elements)
+      dict[kv.second] = kv.first;
+    return dict;
+  }();
+
+  string key = symbol;
+  std::transform(key.begin(), key.end(), key.begin(), ::tolower);
+  auto it = map_symbols.find(key);
+  if (it == map_symbols.end())
+    throw std::runtime_error("Unknown element: " + symbol);
+  return it->second;
+}
+
+/**
+ * \brief Create the atoms from their symbols and coordinates in Angstrom,
+ * the same way that libint2::read_dotxyz does for a file.
+ */
+std::vector<Atom> make_atoms(const std::vector<string> &symbols,
+                             const Coordinates &coords) {
+  // 2010 CODATA value used by libint2::read_dotxyz
+  constexpr double angstrom_to_bohr = 1 / 0.52917721092;
+  if (static_cast<long>(symbols.size()) != coords.rows())
+    throw std::runtime_error("The number of symbols and coordinates differ");
+
+  std::vector<Atom> atoms(symbols.size());
+  for (size_t i = 0; i < symbols.size(); i++) {
+    atoms[i].atomic_number = get_atomic_number(symbols[i]);
+    atoms[i].x = coords(i, 0) * angstrom_to_bohr;
+    atoms[i].y = coords(i, 1) * angstrom_to_bohr;
+    atoms[i].z = coords(i, 2) * angstrom_to_bohr;
+  }
+  return atoms;
+}
+
 /**
  * \brief Compute the coupling integrals for the 2 given molecular geometries
  * and basis_name.
@@ -410,19 +452,20 @@ libint2::svector<Shell> create_shells_for_atom(const CP2K_Basis_Atom &data,
 }
 
 /**
- * \brief Make the shell for a CP2K specific basis
+ * \brief Make the shell for a CP2K specific basis, reusing the basis
+ * specification already stored in `dict` and reading only the missing
+ * elements from the HDF5.
  */
-std::vector<Shell> make_cp2k_basis(const std::vector<Atom> &atoms,
-                                   const string &path_hdf5,
-                                   const string &basis) {
+std::vector<Shell>
+make_cp2k_basis(const std::vector<Atom> &atoms,
+                std::unordered_map<string, CP2K_Basis_Atom> &dict,
+                const string &path_hdf5, const string &basis) {
   std::vector<Shell> shells;
 
-  // set of symbols
-  std::vector<string> symbols = get_unique_symbols(atoms);
-
-  // Read basis set data from the HDF5
-  std::unordered_map<string, CP2K_Basis_Atom> dict =
-      create_map_symbols_basis(path_hdf5, atoms, basis);
+  // Read the basis set data of the new elements from the HDF5
+  for (const auto &at : get_unique_symbols(atoms))
+    if (dict.find(at) == dict.end())
+      dict[at] = read_basis_from_hdf5(path_hdf5, at, basis);
 
   for (const auto &atom : atoms) {
 
@@ -433,6 +476,20 @@ std::vector<Shell> make_cp2k_basis(const std::vector<Atom> &atoms,
 
   return shells;
 }
+
+/**
+ * \brief Make the shell for a CP2K specific basis
+ */
+std::vector<Shell> make_cp2k_basis(const std::vector<Atom> &atoms,
+                                   const string &path_hdf5,
+                                   const string &basis) {
+  // Read basis set data from the HDF5
+  std::unordered_map<string, CP2K_Basis_Atom> dict =
+      create_map_symbols_basis(path_hdf5, atoms, basis);
+
+  return make_cp2k_basis(atoms, dict, path_hdf5, basis);
+}
+
 Matrix compute_integrals_couplings(const string &path_xyz_1,
                                    const string &path_xyz_2,
                                    const string &path_hdf5,
@@ -497,6 +554,44 @@ std::vector<Matrix> select_multipole(const std::vector<Atom> &atoms,
     throw std::runtime_error("Unkown multipole");
 }
 
+/**
+ * \brief Stack the matrices along the rows of a single super matrix.
+ */
+Matrix stack_matrices(const std::vector<Matrix> &matrices) {
+  Matrix super_matrix(matrices[0].rows() * matrices.size(), matrices[0].cols());
+  for (int op = 0; op != static_cast<int>(matrices.size()); ++op) {
+    int i = op * matrices[0].rows();
+    super_matrix.block(i, 0, matrices[op].rows(), matrices[op].cols()) =
+        matrices[op];
+  }
+
+  return super_matrix;
+}
+
+/**
+ * \brief Compute the multipole integrals for the given `mol` using the
+ * `basis_name`
+ */
+Matrix compute_integrals_multipole_for_atoms(const std::vector<Atom> &mol,
+                                             const string &path_hdf5,
+                                             const string &basis_name,
+                                             const string &multipole) {
+  set_nthread();
+
+  auto shells = make_cp2k_basis(mol, path_hdf5, basis_name);
+
+  // safe to use libint now
+  libint2::initialize();
+
+  // compute Overlap integrals
+  auto matrices = select_multipole(mol, shells, multipole);
+
+  // stop using libint2
+  libint2::finalize();
+
+  return stack_matrices(matrices);
+}
+
 /**
  * \brief   Compute the overlap integrals for the molecule define in `path_xyz`
  * using the `basis_name`
@@ -505,28 +600,58 @@ Matrix compute_integrals_multipole(const string &path_xyz,
                                    const string &path_hdf5,
                                    const string &basis_name,
                                    const string &multipole) {
-  set_nthread();
   std::vector<Atom> mol = read_xyz_from_file(path_xyz);
+  return compute_integrals_multipole_for_atoms(mol, path_hdf5, basis_name,
+                                               multipole);
+}
 
-  auto shells = make_cp2k_basis(mol, path_hdf5, basis_name);
+/**
+ * \brief Compute the multipole integrals for the molecule given by its
+ * `symbols` and `coords` in Angstrom, without writing it to a file.
+ */
+Matrix compute_integrals_multipole_from_arrays(const std::vector<string> &symbols,
+                                               const Coordinates &coords,
+                                               const string &path_hdf5,
+                                               const string &basis_name,
+                                               const string &multipole) {
+  std::vector<Atom> mol = make_atoms(symbols, coords);
+  return compute_integrals_multipole_for_atoms(mol, path_hdf5, basis_name,
+                                               multipole);
+}
+
+/**
+ * \brief Compute the multipole integrals for all the molecules given by their
+ * `symbols` and `coords` in Angstrom, setting up the threads and libint2 and
+ * reading the basis set from the HDF5 only once for the whole batch.
+ */
+std::vector<Matrix> compute_integrals_multipole_batch(
+    const std::vector<std::vector<string>> &symbols,
+    const std::vector<Coordinates> &coords, const string &path_hdf5,
+    const string &basis_name, const string &multipole) {
+  if (symbols.size() != coords.size())
+    throw std::runtime_error("The number of symbols and coordinates differ");
+  set_nthread();
+
+  // basis set specification shared by all the molecules
+  std::unordered_map<string, CP2K_Basis_Atom> dict;
+
+  std::vector<Matrix> super_matrices;
+  super_matrices.reserve(symbols.size());
 
   // safe to use libint now
   libint2::initialize();
 
-  // compute Overlap integrals
-  auto matrices = select_multipole(mol, shells, multipole);
+  for (size_t i = 0; i < symbols.size(); i++) {
+    std::vector<Atom> mol = make_atoms(symbols[i], coords[i]);
+    auto shells = make_cp2k_basis(mol, dict, path_hdf5, basis_name);
+    super_matrices.push_back(
+        stack_matrices(select_multipole(mol, shells, multipole)));
+  }
 
   // stop using libint2
   libint2::finalize();
 
-  Matrix super_matrix(matrices[0].rows() * matrices.size(), matrices[0].cols());
-  for (int op = 0; op != static_cast<int>(matrices.size()); ++op) {
-    int i = op * matrices[0].rows();
-    super_matrix.block(i, 0, matrices[op].rows(), matrices[op].cols()) =
-        matrices[op];
-  }
-
-  return super_matrix;
+  return super_matrices;
 }
 
 PYBIND11_MODULE(compute_integrals, m) {
@@ -536,6 +661,23 @@ PYBIND11_MODULE(compute_integrals, m) {
   m.def("compute_integrals_couplings", &compute_integrals_couplings,
         py::return_value_policy::reference_internal);
 
-  m.def("compute_integrals_multipole", &compute_integrals_multipole,
-        py::return_value_policy::reference_internal);
+  m.def(
+      "compute_integrals_multipole",
+      [](const string &path_xyz, const string &path_hdf5,
+         const string &basis_name, const string &multipole) {
+        if (PyErr_WarnEx(PyExc_DeprecationWarning,
+                         "compute_integrals_multipole is deprecated, use "
+                         "compute_integrals_multipole_from_arrays instead",
+                         1) != 0)
+          throw py::error_already_set();
+        return compute_integrals_multipole(path_xyz, path_hdf5, basis_name,
+                                           multipole);
+      },
+      py::return_value_policy::reference_internal);
+
+  m.def("compute_integrals_multipole_from_arrays",
+        &compute_integrals_multipole_from_arrays);
+
+  m.def("compute_integrals_multipole_batch",
+        &compute_integrals_multipole_batch);
 }
@@ -25,6 +25,7 @@
 
 #include <pybind11/eigen.h>
 #include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
 
 // Eigen matrix algebra library
 #include <Eigen/Dense>
@@ -47,6 +48,11 @@ using real_t = libint2::scalar_type;
 // integrals returned by the Libint integral library
 using Matrix =
     Eigen::Matrix<real_t, Eigen::Dynamic, Eigen::Dynamic, Eigen::RowMajor>;
+static_assert(Matrix::IsRowMajor,
+              "the matrices are returned to python as C-contiguous arrays");
+
+// Cartesian coordinates of the atoms in rows
+using Coordinates = Eigen::Matrix<double, Eigen::Dynamic, 3, Eigen::RowMajor>;
 
 struct CP2K_Basis_Atom {
   // Contains the basis specificationf for a given atom
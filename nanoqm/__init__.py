@@ -1,5 +1,5 @@
 from .analysis import (
-    autocorrelate, dephasing, convolute, func_conv, gauss_function,
+    autocorrelate, dephasing, convolute, convolute_fft, func_conv, gauss_function,
     parse_list_of_lists, read_couplings, read_energies,
     read_energies_pyxaid, read_pops_pyxaid, spectral_density
 )
@@ -14,7 +14,7 @@ from .workflows import (
 
 __all__ = [
     'autocorrelate', 'calculate_couplings_levine', 'calculate_mos',
-    'compute_overlaps_for_coupling', 'convolute', 'dephasing',
+    'compute_overlaps_for_coupling', 'convolute', 'convolute_fft', 'dephasing',
     'func_conv', 'gauss_function', 'lazy_couplings',
     'parse_list_of_lists', 'read_couplings', 'read_energies',
     'read_energies_pyxaid', 'read_pops_pyxaid', 'spectral_density',
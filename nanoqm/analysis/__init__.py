@@ -1,10 +1,10 @@
 """Tools for postprocessing."""
-from .tools import (autocorrelate, convolute, dephasing, func_conv,
-                    gauss_function, parse_list_of_lists, read_couplings,
-                    read_energies, read_energies_pyxaid, read_pops_pyxaid,
-                    spectral_density)
+from .tools import (autocorrelate, convolute, convolute_fft, dephasing,
+                    func_conv, gauss_function, parse_list_of_lists,
+                    read_couplings, read_energies, read_energies_pyxaid,
+                    read_pops_pyxaid, spectral_density)
 
 __all__ = [
-    'autocorrelate', 'dephasing', 'convolute', 'func_conv', 'gauss_function',
-    'parse_list_of_lists', 'read_couplings', 'read_energies',
+    'autocorrelate', 'dephasing', 'convolute', 'convolute_fft', 'func_conv',
+    'gauss_function', 'parse_list_of_lists', 'read_couplings', 'read_energies',
     'read_energies_pyxaid', 'read_pops_pyxaid', 'spectral_density']
@@ -11,20 +11,27 @@ API
 """
 
 import os
-from typing import Tuple
+from typing import Tuple, Union
 
 import numpy as np
 import pyparsing as pa
 from scipy.optimize import curve_fit
+from scipy.signal import fftconvolve
 
 from ..common import fs_to_cm, h2ev, hbar, r2meV
 
+#: Normalization constant of the Gaussian kernel used by :func:`func_conv`
+SQRT_2_PI = np.sqrt(2 / np.pi)
+
+#: Smallest broadening, in grid steps, for which :func:`convolute_fft` bins the sticks
+MIN_SIGMA_STEPS = 5
+
 """ Functions to fit data """
 
 
 def gauss_function(x: float, sigma: float) -> np.ndarray:
     """Compute a Gaussian function used for fitting data."""
-    return np.exp(-0.5 * (-x / sigma) ** 2)
+    return np.exp(np.square(x) * (-0.5 / sigma ** 2))
 
 
 def lorentzian_function(x_L, sigma_L, amplitude_L):
@@ -52,9 +59,21 @@ def sqrt_func(x, a):
     return a * np.sqrt(x)
 
 
-def func_conv(x_real: np.ndarray, x_grid: np.ndarray, delta: float) -> np.ndarray:
-    """Compute a convolution on a grid using a Gaussian function."""
-    return np.exp(-2 * (x_grid - x_real) ** 2 / delta ** 2)
+def func_conv(
+        x_real: Union[float, np.ndarray], x_grid: Union[float, np.ndarray],
+        delta: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Compute a convolution on a grid using a Gaussian function.
+
+    The arguments are broadcasted against each other, a float is returned
+    if all of them are scalars.
+    """
+    # Evaluate the exponent in place to avoid allocating a temporary per ufunc
+    arr = np.empty(np.broadcast(x_grid, x_real, delta).shape)
+    np.subtract(x_grid, x_real, out=arr)
+    np.square(arr, out=arr)
+    np.multiply(arr, -2 / np.square(delta), out=arr)
+    np.exp(arr, out=arr)
+    return arr if arr.ndim else float(arr)
 
 
 def convolute(x: np.ndarray, y: np.ndarray, x_points: np.ndarray, sigma: float) -> np.ndarray:
@@ -63,13 +82,100 @@ def convolute(x: np.ndarray, y: np.ndarray, x_points: np.ndarray, sigma: float)
     You need as input x, y and the grid where to convolute.
     """
     # Compute gaussian prefactor
-    prefactor = np.sqrt(2.0) / (sigma * np.sqrt(np.pi))
-    # Convolute spectrum over grid
-    y_points = prefactor * np.stack(
-        np.sum(y * func_conv(x, x_point, sigma)) for x_point in x_points)
+    prefactor = SQRT_2_PI / sigma
+    # Convolute spectrum over grid, broadcasting the grid (rows) against
+    # the sticks (columns) and contracting the sticks in a single product
+    x = np.ravel(x)
+    kernel = func_conv(x[np.newaxis, :], np.asarray(x_points)[:, np.newaxis], sigma)
+    y_points = prefactor * (kernel @ np.ravel(y))
     return y_points
 
 
+def convolute_fft(x: np.ndarray, y: np.ndarray, x_points: np.ndarray,
+                  sigma: Union[float, np.ndarray], rtol: float = 0.01) -> np.ndarray:
+    """Convolute a spectrum on a uniform grid of x_points using a FFT.
+
+    The sticks ``(x, y)`` are distributed linearly over the two nearest grid
+    points and the resulting histogram is convoluted with a single sample of
+    the Gaussian kernel, which scales as O(N log N) instead of the
+    O(N_grid * N_sticks) cost of :func:`convolute`.
+
+    ``sigma`` can also be an array with a broadening per stick. In that case
+    the kernels are only sampled for a set of widths geometrically spaced by
+    a factor ``1 + rtol`` and every stick is split linearly between the two
+    kernels bracketing its width. The splitting error is small (below 0.01% of
+    the peak for the default ``rtol``), so the accuracy is set by the binning of
+    the narrowest sticks, as described below.
+
+    The linear binning is only accurate when the broadening spans several grid
+    steps: the error is about 1% of the peak for ``sigma = 5 * step`` and it
+    grows quickly for narrower Gaussians (about 10% for ``sigma = step``).
+    Therefore, if the smallest ``sigma`` is below :data:`MIN_SIGMA_STEPS` grid
+    steps, the convolution is evaluated directly as in :func:`convolute`.
+
+    Raises
+    ------
+    ValueError
+        If the grid is not uniform, has less than two points, or if any
+        ``sigma`` is not positive.
+
+    """
+    x_points = np.asarray(x_points, dtype=np.float64)
+    if x_points.size < 2:
+        raise ValueError("convolute_fft requires a grid with at least two points")
+    step = x_points[1] - x_points[0]
+    if not np.allclose(np.diff(x_points), step):
+        raise ValueError("convolute_fft requires a uniformly spaced grid")
+
+    x = np.ravel(x)
+    y = np.ravel(y)
+    sigmas = np.broadcast_to(np.asarray(sigma, dtype=np.float64), x.shape)
+    if not np.all(sigmas > 0):
+        raise ValueError("convolute_fft requires positive values of sigma")
+
+    # Kernel widths and the linear weights of each stick over them
+    sigma_min, sigma_max = sigmas.min(), sigmas.max()
+    if sigma_min < MIN_SIGMA_STEPS * abs(step):
+        # The binning is too coarse for the narrowest Gaussians
+        kernel = func_conv(x[np.newaxis, :], x_points[:, np.newaxis], sigmas[np.newaxis, :])
+        return kernel @ (SQRT_2_PI / sigmas * y)
+    nwidths = 1 + int(np.ceil(np.log(sigma_max / sigma_min) / np.log1p(rtol)))
+    widths = np.geomspace(sigma_min, sigma_max, nwidths)
+    if nwidths == 1:
+        index = np.zeros(x.size, dtype=np.int64)
+        frac_width = np.zeros(x.size)
+    else:
+        index = np.clip(np.searchsorted(widths, sigmas) - 1, 0, nwidths - 2)
+        frac_width = np.clip(
+            (sigmas - widths[index]) / (widths[index + 1] - widths[index]), 0, 1)
+
+    # Half width of the kernels, beyond which the Gaussians are negligible
+    half = int(np.ceil(4 * sigma_max / step))
+    npoints = x_points.size + 2 * half
+
+    # Bin the sticks on the grid padded with the kernel half width, so that
+    # sticks slightly outside of the grid still contribute with their tails
+    pos = (x - x_points[0]) / step + half
+    low = np.floor(pos)
+    frac = pos - low
+    low = low.astype(np.int64)
+    inside = (low >= 0) & (low < npoints)
+    low, frac, index = low[inside], frac[inside], index[inside]
+    weights, frac_width = y[inside], frac_width[inside]
+
+    sticks = np.zeros((nwidths + 1, npoints + 1))
+    for shift_width, w_width in ((0, 1 - frac_width), (1, frac_width)):
+        for shift, w in ((0, 1 - frac), (1, frac)):
+            np.add.at(sticks, (index + shift_width, low + shift), weights * w_width * w)
+
+    offsets = np.arange(-half, half + 1) * step
+    prefactors = SQRT_2_PI / widths
+    kernels = prefactors[:, np.newaxis] * func_conv(
+        offsets[np.newaxis, :], 0.0, widths[:, np.newaxis])
+    y_points = fftconvolve(sticks[:nwidths, :npoints], kernels, mode='same', axes=1)
+    return y_points[:, half: half + x_points.size].sum(axis=0)
+
+
 """ Useful functions to compute autocorrelation, dephasing, etc. """
 
 
@@ -158,12 +264,23 @@ def fit_dephasing(fit_func, deph, ts, res, t_deph_guess):
     return ts_fit, deph_fit, deph_time, deph_time_err, e_fwhm, e_fwhm_err
 
 
+def stack_files(files, read):
+    """Stack the arrays read from `files` into an array allocated only once."""
+    first = read(files[0])
+    xs = np.empty((len(files), *first.shape), dtype=first.dtype)
+    xs[0] = first
+    for k, fn in enumerate(files[1:], 1):
+        xs[k] = read(fn)
+    return xs
+
+
 def read_couplings(path_hams, ts):
     """Read the non adiabatic coupling vectors from the files generated for the NAMD simulations."""
     files_im = [os.path.join(path_hams, f'Ham_{i}_im')
                 for i in range(ts)]
-    xs = np.stack(np.loadtxt(fn) for fn in files_im)
-    return xs * r2meV  # return energies in meV
+    xs = stack_files(files_im, np.loadtxt)
+    xs *= r2meV
+    return xs  # return energies in meV
 
 
 def read_energies(path_hams, ts):
@@ -173,16 +290,17 @@ def read_energies(path_hams, ts):
     """
     files_re = [os.path.join(path_hams, f'Ham_{i}_re')
                 for i in range(ts)]
-    xs = np.stack(np.diag(np.loadtxt(fn)) for fn in files_re)
-    return xs * r2meV / 1000  # return energies in eV
+    xs = stack_files(files_re, lambda fn: np.diag(np.loadtxt(fn)))
+    xs *= r2meV / 1000
+    return xs  # return energies in eV
 
 
 def read_energies_pyxaid(path, fn, nstates, nconds):
     """Read the molecular orbital energies of each state from the output files generated by PYXAID."""
     inpfile = os.path.join(path, fn)
     cols = tuple(range(5, nstates * 2 + 5, 2))
-    xs = np.stack(np.loadtxt(f'{inpfile}{j}', usecols=cols)
-                  for j in range(nconds)).transpose()
+    xs = stack_files([f'{inpfile}{j}' for j in range(nconds)],
+                     lambda fn: np.loadtxt(fn, usecols=cols)).transpose()
     # Rows = timeframes ; Columns = states ; tensor = initial conditions
     xs = xs.swapaxes(0, 1)
     return xs
@@ -192,8 +310,8 @@ def read_pops_pyxaid(path, fn, nstates, nconds):
     """Read the population of each state from the output files generated by PYXAID."""
     inpfile = os.path.join(path, fn)
     cols = tuple(range(3, nstates * 2 + 3, 2))
-    xs = np.stack(np.loadtxt(f'{inpfile}{j}', usecols=cols)
-                  for j in range(nconds)).transpose()
+    xs = stack_files([f'{inpfile}{j}' for j in range(nconds)],
+                     lambda fn: np.loadtxt(fn, usecols=cols)).transpose()
     # Rows = timeframes ; Columns = states ; tensor = initial conditions
     xs = xs.swapaxes(0, 1)
     return xs
@@ -209,6 +327,6 @@ def parse_list_of_lists(xs: list):
     enclosed << (natural | pa.Suppress(',') | nestedBrackets)
     try:
         rs = enclosed.parseString(xs).asList()[0]
-        return list(map(lambda x: list(map(int, x)), rs))
+        return [[int(x) for x in r] for r in rs]
     except pa.ParseException:
         raise RuntimeError("Invalid Macro states Specification")
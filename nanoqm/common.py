@@ -5,33 +5,42 @@ Index
 .. currentmodule:: nanoqm.common
 .. autosummary::
     DictConfig
+    MolArrays
     change_mol_units
     getmass
     number_spherical_functions_per_atom
     retrieve_hdf5_data
+    retrieve_hdf5_tensor
     is_data_in_hdf5
+    is_hdf5_empty
+    sqrt_symmetric_matrix
     store_arrays_in_hdf5
 
 API
 ---
 .. autoclass:: DictConfig
+.. autoclass:: MolArrays
 .. autofunction:: is_data_in_hdf5
+.. autofunction:: is_hdf5_empty
 .. autofunction:: retrieve_hdf5_data
+.. autofunction:: retrieve_hdf5_tensor
 .. autofunction:: number_spherical_functions_per_atom
+.. autofunction:: sqrt_symmetric_matrix
 .. autofunction:: store_arrays_in_hdf5
 
 """
 
-__all__ = ['DictConfig', 'Matrix', 'Tensor3D', 'Vector',
+__all__ = ['DictConfig', 'Matrix', 'MolArrays', 'Tensor3D', 'Vector',
            'change_mol_units', 'getmass', 'h2ev', 'hardness',
-           'number_spherical_functions_per_atom', 'retrieve_hdf5_data',
-           'is_data_in_hdf5', 'store_arrays_in_hdf5']
+           'number_spherical_functions_per_atom', 'retrieve_hdf5_data', 'retrieve_hdf5_tensor',
+           'is_data_in_hdf5', 'is_hdf5_empty', 'sqrt_symmetric_matrix', 'store_arrays_in_hdf5']
 
 
 import os
+from functools import lru_cache
 from itertools import chain, repeat
 from pathlib import Path
-from typing import (Any, Dict, Iterable, List, Mapping, NamedTuple, Tuple,
+from typing import (Any, Dict, Iterable, List, Mapping, NamedTuple, Sequence, Tuple,
                     Union, overload)
 
 import h5py
@@ -66,6 +75,41 @@ class BasisFormats(NamedTuple):
     value: List[str]
 
 
+class MolArrays(NamedTuple):
+    """Molecular geometry stored as arrays of symbols and (N, 3) coordinates."""
+
+    symbols: np.ndarray
+    coords: np.ndarray
+
+    @classmethod
+    def from_atoms(cls, mol: List[AtomXYZ]) -> "MolArrays":
+        """Create the arrays from a list of :class:`AtomXYZ`."""
+        symbols = np.array([atom.symbol for atom in mol], dtype=object)
+        coords = np.array([atom.xyz for atom in mol], dtype=np.float64).reshape(-1, 3)
+        return cls(symbols, coords)
+
+    @classmethod
+    def from_string(cls, xs: str, factor: float = 1.0) -> "MolArrays":
+        """Parse a molecular geometry in XYZ format, scaling the coordinates by ``factor``.
+
+        The atomic lines are split in a single pass and the coordinates are
+        converted at once, instead of parsing the geometry atom by atom.
+        """
+        lines = xs.splitlines()
+        natoms = int(lines[0].split()[0])
+        tokens = np.array(' '.join(lines[2: natoms + 2]).split()).reshape(natoms, 4)
+        symbols = np.char.lower(tokens[:, 0]).astype(object)
+        coords = tokens[:, 1:].astype(np.float64)
+        if factor != 1.0:
+            coords *= factor
+        return cls(symbols, coords)
+
+    def to_atoms(self) -> List[AtomXYZ]:
+        """Convert the arrays back to a list of :class:`AtomXYZ`."""
+        return [AtomXYZ(symbol, tuple(xyz))
+                for symbol, xyz in zip(self.symbols.tolist(), self.coords.tolist())]
+
+
 def concat(xss: Iterable) -> List[Any]:
     """Concatenate of all the elements of a list."""
     return list(chain(*xss))
@@ -104,56 +148,66 @@ def path_to_posix(path: PathLike) -> PathLike:
 
 def getmass(s: str) -> int:
     """Get the atomic mass for a given element s."""
-    element = mendeleev.element(s.capitalize())
-    return element.mass_number
+    return _get_mass_number(s.capitalize())
+
+
+@lru_cache(maxsize=None)
+def _get_mass_number(symbol: str) -> int:
+    """Query (only once per element) the mendeleev database."""
+    return mendeleev.element(symbol).mass_number
+
+
+#: Chemical hardness of the elements in eV
+_HARDNESS = {
+    'h': 6.4299, 'he': 12.5449, 'li': 2.3746, 'be': 3.4968, 'b': 4.619, 'c': 5.7410,
+    'n': 6.8624, 'o': 7.9854, 'f': 9.1065, 'ne': 10.2303, 'na': 2.4441, 'mg': 3.0146,
+    'al': 3.5849, 'si': 4.1551, 'p': 4.7258, 's': 5.2960, 'cl': 5.8662, 'ar': 6.4366,
+    'k': 2.3273, 'ca': 2.7587, 'sc': 2.8582, 'ti': 2.9578, 'v': 3.0573, 'cr': 3.1567,
+    'mn': 3.2564, 'fe': 3.3559, 'co': 3.4556, 'ni': 3.555, 'cu': 3.6544, 'zn': 3.7542,
+    'ga': 4.1855, 'ge': 4.6166, 'as': 5.0662, 'se': 5.4795, 'br': 5.9111, 'kr': 6.3418,
+    'rb': 2.1204, 'sr': 2.5374, 'y': 2.6335, 'zr': 2.7297, 'nb': 2.8260, 'mo': 2.9221,
+    'tc': 3.0184, 'ru': 3.1146, 'rh': 3.2107, 'pd': 3.3069, 'ag': 3.4032, 'cd': 3.4994,
+    'in': 3.9164, 'sn': 4.3332, 'sb': 4.7501, 'te': 5.167, 'i': 5.5839, 'xe': 6.0009,
+    'cs': 0.6829, 'ba': 0.9201, 'la': 1.1571, 'ce': 1.3943, 'pr': 1.6315, 'nd': 1.8686,
+    'pm': 2.1056, 'sm': 2.3427, 'eu': 2.5798, 'gd': 2.8170, 'tb': 3.0540, 'dy': 3.2912,
+    'ho': 3.5283, 'er': 3.7655, 'tm': 4.0026, 'yb': 4.2395, 'lu': 4.4766, 'hf': 4.7065,
+    'ta': 4.9508, 'w': 5.1879, 're': 5.4256, 'os': 5.6619, 'ir': 5.900, 'pt': 6.1367,
+    'au': 6.3741, 'hg': 6.6103, 'tl': 1.7043, 'pb': 1.9435, 'bi': 2.1785, 'po': 2.4158,
+    'at': 2.6528, 'rn': 2.8899, 'fr': 0.9882, 'ra': 1.2819, 'ac': 1.3497, 'th': 1.4175,
+    'pa': 1.9368, 'u': 2.2305, 'np': 2.5241, 'pu': 3.0436, 'am': 3.4169, 'cm': 3.4050,
+    'bk': 3.9244, 'cf': 4.2181, 'es': 4.5116, 'fm': 4.8051, 'md': 5.0100, 'no': 5.3926,
+    'lr': 5.4607}
+
+#: Parameters of the exchange-correlation functionals used by sTDA
+_XC_FUNCTIONALS = {
+    'pbe': {
+        'type': 'pure', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0, 'beta1': 0.2, 'beta2': 1.83},
+    'blyp': {
+        'type': 'pure', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0, 'beta1': 0.2, 'beta2': 1.83},
+    'bp': {
+        'type': 'pure', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0, 'beta1': 0.2, 'beta2': 1.83},
+    'pbe0': {
+        'type': 'hybrid', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0.25, 'beta1': 0.2, 'beta2': 1.83},
+    'b3lyp': {
+        'type': 'hybrid', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0.20, 'beta1': 0.2, 'beta2': 1.83},
+    'bhlyp': {
+        'type': 'hybrid', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0.50, 'beta1': 0.2, 'beta2': 1.83},
+    'cam-b3lyp': {
+        'type': 'rhs', 'alpha1': 1.86, 'alpha2': 0.00, 'ax': 0.38, 'beta1': 0.90, 'beta2': 0},
+    'lc-blyp': {
+        'type': 'rhs', 'alpha1': 8.0, 'alpha2': 0.00, 'ax': 0.53, 'beta1': 4.50, 'beta2': 0},
+    'wb97': {
+        'type': 'rhs', 'alpha1': 8.0, 'alpha2': 0.00, 'ax': 0.61, 'beta1': 4.41, 'beta2': 0.0}}
 
 
 def hardness(s: str) -> float:
     """Get the element hardness."""
-    d = {
-        'h': 6.4299, 'he': 12.5449, 'li': 2.3746, 'be': 3.4968, 'b': 4.619, 'c': 5.7410,
-        'n': 6.8624, 'o': 7.9854, 'f': 9.1065, 'ne': 10.2303, 'na': 2.4441, 'mg': 3.0146,
-        'al': 3.5849, 'si': 4.1551, 'p': 4.7258, 's': 5.2960, 'cl': 5.8662, 'ar': 6.4366,
-        'k': 2.3273, 'ca': 2.7587, 'sc': 2.8582, 'ti': 2.9578, 'v': 3.0573, 'cr': 3.1567,
-        'mn': 3.2564, 'fe': 3.3559, 'co': 3.4556, 'ni': 3.555, 'cu': 3.6544, 'zn': 3.7542,
-        'ga': 4.1855, 'ge': 4.6166, 'as': 5.0662, 'se': 5.4795, 'br': 5.9111, 'kr': 6.3418,
-        'rb': 2.1204, 'sr': 2.5374, 'y': 2.6335, 'zr': 2.7297, 'nb': 2.8260, 'mo': 2.9221,
-        'tc': 3.0184, 'ru': 3.1146, 'rh': 3.2107, 'pd': 3.3069, 'ag': 3.4032, 'cd': 3.4994,
-        'in': 3.9164, 'sn': 4.3332, 'sb': 4.7501, 'te': 5.167, 'i': 5.5839, 'xe': 6.0009,
-        'cs': 0.6829, 'ba': 0.9201, 'la': 1.1571, 'ce': 1.3943, 'pr': 1.6315, 'nd': 1.8686,
-        'pm': 2.1056, 'sm': 2.3427, 'eu': 2.5798, 'gd': 2.8170, 'tb': 3.0540, 'dy': 3.2912,
-        'ho': 3.5283, 'er': 3.7655, 'tm': 4.0026, 'yb': 4.2395, 'lu': 4.4766, 'hf': 4.7065,
-        'ta': 4.9508, 'w': 5.1879, 're': 5.4256, 'os': 5.6619, 'ir': 5.900, 'pt': 6.1367,
-        'au': 6.3741, 'hg': 6.6103, 'tl': 1.7043, 'pb': 1.9435, 'bi': 2.1785, 'po': 2.4158,
-        'at': 2.6528, 'rn': 2.8899, 'fr': 0.9882, 'ra': 1.2819, 'ac': 1.3497, 'th': 1.4175,
-        'pa': 1.9368, 'u': 2.2305, 'np': 2.5241, 'pu': 3.0436, 'am': 3.4169, 'cm': 3.4050,
-        'bk': 3.9244, 'cf': 4.2181, 'es': 4.5116, 'fm': 4.8051, 'md': 5.0100, 'no': 5.3926,
-        'lr': 5.4607}
-    return d[s] / 27.211
+    return _HARDNESS[s] / 27.211
 
 
 def xc(s: str) -> Dict[str, Any]:
     """Return the exchange functional composition."""
-    d = {
-        'pbe': {
-            'type': 'pure', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0, 'beta1': 0.2, 'beta2': 1.83},
-        'blyp': {
-            'type': 'pure', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0, 'beta1': 0.2, 'beta2': 1.83},
-        'bp': {
-            'type': 'pure', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0, 'beta1': 0.2, 'beta2': 1.83},
-        'pbe0': {
-            'type': 'hybrid', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0.25, 'beta1': 0.2, 'beta2': 1.83},
-        'b3lyp': {
-            'type': 'hybrid', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0.20, 'beta1': 0.2, 'beta2': 1.83},
-        'bhlyp': {
-            'type': 'hybrid', 'alpha1': 1.42, 'alpha2': 0.48, 'ax': 0.50, 'beta1': 0.2, 'beta2': 1.83},
-        'cam-b3lyp': {
-            'type': 'rhs', 'alpha1': 1.86, 'alpha2': 0.00, 'ax': 0.38, 'beta1': 0.90, 'beta2': 0},
-        'lc-blyp': {
-            'type': 'rhs', 'alpha1': 8.0, 'alpha2': 0.00, 'ax': 0.53, 'beta1': 4.50, 'beta2': 0},
-        'wb97': {
-            'type': 'rhs', 'alpha1': 8.0, 'alpha2': 0.00, 'ax': 0.61, 'beta1': 4.41, 'beta2': 0.0}}
-    return d[s]
+    return _XC_FUNCTIONALS[s]
 
 
 @overload
@@ -202,6 +256,52 @@ def retrieve_hdf5_data(path_hdf5, paths_to_prop):
         raise RuntimeError(msg)
 
 
+def retrieve_hdf5_tensor(path_hdf5: PathLike, paths_to_prop: List[str]) -> np.ndarray:
+    """Read the arrays stored at ``paths_to_prop`` into a single tensor.
+
+    The tensor is allocated only once with the data type stored in the HDF5,
+    and each array is read directly into its slice.
+
+    Parameters
+    ----------
+    path_hdf5
+        path to the HDF5
+    path_to_prop
+        list of paths to arrays with the same shape
+
+    Returns
+    -------
+    np.ndarray
+        Tensor with the arrays stacked along the first axis
+
+    Raises
+    ------
+    KeyError
+        The property has not been found
+
+    """
+    path_hdf5 = path_to_posix(path_hdf5)
+    try:
+        with h5py.File(path_hdf5, 'r') as f5:
+            dsets = [f5[path] for path in paths_to_prop]
+            tensor = np.empty((len(dsets), *dsets[0].shape), dtype=dsets[0].dtype)
+            for k, dset in enumerate(dsets):
+                dset.read_direct(tensor[k])
+    except KeyError:
+        msg = f"There is not {paths_to_prop} stored in the HDF5\n"
+        raise KeyError(msg)
+
+    return tensor
+
+
+def is_hdf5_empty(path_hdf5: PathLike) -> bool:
+    """Check whether the HDF5 file does not exist or is a zero-byte placeholder.
+
+    An empty file cannot be opened in read-only mode, since it lacks the HDF5 signature.
+    """
+    return not os.path.exists(path_hdf5) or os.path.getsize(path_hdf5) == 0
+
+
 def is_data_in_hdf5(path_hdf5: PathLike, xs: Union[str, List[str]]) -> bool:
     """Search if the node exists in the HDF5 file.
 
@@ -219,8 +319,8 @@ def is_data_in_hdf5(path_hdf5: PathLike, xs: Union[str, List[str]]) -> bool:
 
     """
     path_hdf5 = path_to_posix(path_hdf5)
-    if os.path.exists(path_hdf5):
-        with h5py.File(path_hdf5, 'r+') as f5:
+    if not is_hdf5_empty(path_hdf5):
+        with h5py.File(path_hdf5, 'r') as f5:
             if isinstance(xs, list):
                 return all(path in f5 for path in xs)
             else:
@@ -238,7 +338,7 @@ def store_arrays_in_hdf5(
 
 @overload
 def store_arrays_in_hdf5(
-    path_hdf5: PathLike, paths: List[str], tensor: np.ndarray,
+    path_hdf5: PathLike, paths: List[str], tensor: Union[np.ndarray, Sequence[np.ndarray]],
         dtype: float = np.float32, attribute: Union[BasisFormats, None] = None) -> None:
     ...
 
@@ -282,11 +382,21 @@ def store_arrays_in_hdf5(
 
 def change_mol_units(mol: List[AtomXYZ], factor: float = angs2au) -> List[AtomXYZ]:
     """Change the units of the molecular coordinates."""
-    new_molecule = []
-    for atom in mol:
-        coord = tuple(map(lambda x: x * factor, atom.xyz))
-        new_molecule.append(AtomXYZ(atom.symbol, coord))
-    return new_molecule
+    symbols, coords = MolArrays.from_atoms(mol)
+    return MolArrays(symbols, coords * factor).to_atoms()
+
+
+def sqrt_symmetric_matrix(matrix: Matrix) -> Matrix:
+    """Compute the principal square root of a real symmetric matrix.
+
+    Contrary to :func:`scipy.linalg.sqrtm`, which uses a general Schur
+    decomposition, the symmetry of the matrix (e.g. the overlap) is exploited
+    by diagonalizing it with :func:`numpy.linalg.eigh`.
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    # Remove the negative eigenvalues arising from numerical noise
+    np.clip(eigenvalues, 0, None, out=eigenvalues)
+    return (eigenvectors * np.sqrt(eigenvalues)) @ eigenvectors.T
 
 
 def tuplesXYZ_to_plams(xs: List[AtomXYZ]) -> Molecule:
@@ -8,31 +8,47 @@ Index
 .. currentmodule:: nanoqm.integrals.multipole_matrices
 .. autosummary::
     get_multipole_matrix
+    get_overlap_matrix
+    precompute_multipole_matrices
+    ensure_multipole_dataset
     compute_matrix_multipole
+    compute_multipole_matrices
 
 API
 ---
 .. autofunction:: get_multipole_matrix
+.. autofunction:: get_overlap_matrix
+.. autofunction:: precompute_multipole_matrices
+.. autofunction:: ensure_multipole_dataset
 .. autofunction:: compute_matrix_multipole
+.. autofunction:: compute_multipole_matrices
 """
+import hashlib
 import logging
-import os
-import uuid
-from os.path import join
-from typing import List, Optional
+from contextlib import nullcontext
+from os.path import dirname, join, split
+from typing import Any, ContextManager, List, Optional, Tuple
+
+import h5py
 import numpy as np
 
-from compute_integrals import compute_integrals_multipole
+from compute_integrals import (compute_integrals_multipole_batch,
+                               compute_integrals_multipole_from_arrays)
 from qmflows.common import AtomXYZ
 from qmflows.type_hints import PathLike
 
-from ..common import (DictConfig, Matrix, is_data_in_hdf5, retrieve_hdf5_data,
-                      store_arrays_in_hdf5, tuplesXYZ_to_plams)
+from ..common import (DictConfig, Matrix, MolArrays, is_data_in_hdf5, is_hdf5_empty,
+                      retrieve_hdf5_data, store_arrays_in_hdf5)
 
 logger = logging.getLogger(__name__)
 
+#: Number of matrices in each multipole tensor, e.g. overlap + {x, y, z} for the dipole
+MULTIPOLE_COMPONENTS = {'overlap': 1, 'dipole': 4, 'quadrupole': 10}
+
 
-def get_multipole_matrix(config: DictConfig, inp: DictConfig, multipole: str) -> Matrix:
+def get_multipole_matrix(
+        config: DictConfig, inp: DictConfig, multipole: str,
+        lock: Optional[ContextManager[Any]] = None) -> Matrix:
     """Retrieve the `multipole` number `i` from the trajectory. Otherwise compute it.
 
     Parameters
@@ -43,6 +59,8 @@ def get_multipole_matrix(config: DictConfig, inp: DictConfig, multipole: str) ->
         Information about the current point, e.g. molecular geometry.
     multipole
         Either overlap, dipole or quadrupole.
+    lock
+        Held while the HDF5 is read or written, but not while the multipole is computed.
 
     Returns
     -------
@@ -50,29 +68,242 @@ def get_multipole_matrix(config: DictConfig, inp: DictConfig, multipole: str) ->
         Tensor containing the multipole.
 
     """
-    root = join(config.project_name, 'multipole',
-                f'point_{inp.i + config.enumerate_from}')
     path_hdf5 = config.path_hdf5
-    path_multipole_hdf5 = join(root, multipole)
-    matrix_multipole = search_multipole_in_hdf5(
-        path_hdf5, path_multipole_hdf5, multipole)
+    path_multipole_hdf5 = create_multipole_path(config, multipole)
+    index = inp.i + config.enumerate_from
+    lock = nullcontext() if lock is None else lock
+    with lock:
+        copy_legacy_multipoles(
+            path_hdf5, candidate_multipole_paths(config, multipole), [index])
+        matrix_multipole = search_multipole_in_hdf5(
+            path_hdf5, path_multipole_hdf5, multipole, index)
 
     if matrix_multipole is None:
         matrix_multipole = compute_matrix_multipole(inp.mol, config, multipole)
-        store_arrays_in_hdf5(path_hdf5, path_multipole_hdf5, matrix_multipole)
+        with lock:
+            store_multipoles_in_hdf5(
+                path_hdf5, path_multipole_hdf5, [index], [matrix_multipole])
 
     return matrix_multipole
 
 
+def get_overlap_matrix(config: DictConfig, mol: List[AtomXYZ]) -> Matrix:
+    """Retrieve the overlap matrix of the geometry `mol` from the HDF5. Otherwise compute it.
+
+    Contrary to the multipoles of a trajectory, the overlap is not looked up by
+    frame index but by a hash of the atomic symbols, the coordinates and the basis
+    set name. Therefore it is only reused for the same molecule and basis.
+
+    Parameters
+    ----------
+    config
+        Global configuration to run a workflow
+    mol
+        Molecular geometry
+
+    Returns
+    -------
+    np.ndarray
+        Overlap matrix.
+
+    """
+    path_hdf5 = config.path_hdf5
+    path_overlap_hdf5 = join(config.project_name, 'overlap', geometry_basis_key(config, mol))
+    if is_data_in_hdf5(path_hdf5, path_overlap_hdf5):
+        logger.info("retrieving multipole: overlap from the hdf5")
+        return retrieve_hdf5_data(path_hdf5, path_overlap_hdf5)
+
+    logger.info("computing multipole: overlap")
+    overlap = compute_matrix_multipole(mol, config, 'overlap')
+    store_arrays_in_hdf5(path_hdf5, path_overlap_hdf5, overlap, dtype=overlap.dtype)
+
+    return overlap
+
+
+def geometry_basis_key(config: DictConfig, mol: List[AtomXYZ]) -> str:
+    """Hash the atomic symbols and coordinates of `mol` together with the basis set name."""
+    symbols, coords = MolArrays.from_atoms(mol)
+    digest = hashlib.sha256(config["cp2k_general_settings"]["basis"].encode())
+    digest.update(" ".join(symbols.tolist()).encode())
+    digest.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def precompute_multipole_matrices(
+        config: DictConfig, inputs: List[DictConfig], multipole: str) -> None:
+    """Compute with a single libint2 call the `multipole` of the points missing in the HDF5.
+
+    Parameters
+    ----------
+    config
+        Global configuration to run a workflow
+    inputs
+        Information about each point, e.g. molecular geometry.
+    multipole
+        Either overlap, dipole or quadrupole.
+
+    """
+    path_hdf5 = config.path_hdf5
+    path_multipole_hdf5 = create_multipole_path(config, multipole)
+    indices = [inp.i + config.enumerate_from for inp in inputs]
+    # The multipole can also be sliced from a higher multipole already stored
+    candidates = candidate_multipole_paths(config, multipole)
+    copy_legacy_multipoles(path_hdf5, candidates, indices)
+    computed = [multipoles_in_hdf5(path_hdf5, path, indices) for path in candidates]
+    missing = [k for k, is_computed in enumerate(zip(*computed)) if not any(is_computed)]
+    if not missing:
+        return
+
+    logger.info(f"computing multipole: {multipole} for {len(missing)} points")
+    matrices = compute_multipole_matrices([inputs[k].mol for k in missing], config, multipole)
+    store_multipoles_in_hdf5(
+        path_hdf5, path_multipole_hdf5, [indices[k] for k in missing], matrices)
+
+
+def create_multipole_path(config: DictConfig, multipole: str) -> str:
+    """Create the path of the dataset with the `multipole` of the whole trajectory."""
+    return join(config.project_name, 'multipole', multipole)
+
+
+def candidate_multipole_paths(config: DictConfig, multipole: str) -> List[str]:
+    """Paths of the datasets from which the `multipole` can be read or sliced."""
+    ncomponents = MULTIPOLE_COMPONENTS[multipole]
+    return [create_multipole_path(config, name)
+            for name, n in MULTIPOLE_COMPONENTS.items() if n >= ncomponents]
+
+
+def create_legacy_multipole_path(path_multipole_hdf5: str, index: int) -> str:
+    """Create the path of the frame `index` in the previous layout with a dataset per point."""
+    root, multipole = split(path_multipole_hdf5)
+    return join(root, f'point_{index}', multipole)
+
+
+def copy_legacy_multipoles(
+        path_hdf5: PathLike, paths_multipole_hdf5: List[str], indices: List[int]) -> None:
+    """Copy the frames `indices` stored in the previous layout into the multipole datasets.
+
+    HDF5 files created before the multipoles of a trajectory were stored in a single
+    dataset contain a ``multipole/point_i/<multipole>`` dataset per point. The frames
+    found there, and missing from the new datasets, are copied instead of being
+    recomputed. The legacy datasets are left untouched.
+    """
+    if is_hdf5_empty(path_hdf5):
+        return
+    with h5py.File(path_hdf5, 'r') as f5:
+        legacy = {path: [index for index, is_computed in
+                         zip(indices, frames_in_dataset(f5, path, indices))
+                         if not is_computed and
+                         create_legacy_multipole_path(path, index) in f5]
+                  for path in paths_multipole_hdf5}
+    if not any(legacy.values()):
+        return
+
+    with h5py.File(path_hdf5, 'r+') as f5:
+        for path, frames in legacy.items():
+            if not frames:
+                continue
+            logger.info(f"copying {len(frames)} points of {path} from the legacy layout")
+            for index in frames:
+                matrix = f5[create_legacy_multipole_path(path, index)][()]
+                dset = ensure_multipole_dataset(f5, path, max(frames) + 1, matrix)
+                dset[index] = matrix
+
+
+def multipole_chunks(matrix_multipole: Matrix, size: int = 512) -> Tuple[int, ...]:
+    """Chunk the multipole in blocks of at most `size` x `size` for a single component.
+
+    For the single precision used in the HDF5 the blocks take at most 1 MB,
+    the size of the default HDF5 chunk cache.
+    """
+    *components, rows, cols = matrix_multipole.shape
+    return (*(1 for _ in components), min(rows, size), min(cols, size))
+
+
+def ensure_multipole_dataset(
+        f5: h5py.File, path_multipole_hdf5: str, nframes: int,
+        matrix_multipole: Matrix) -> h5py.Dataset:
+    """Get the dataset with the multipoles of `nframes` points, creating it if necessary.
+
+    The dataset has shape ``(nframes, *matrix_multipole.shape)`` and grows along the
+    first axis if more frames are requested. Frames that have not been computed yet
+    are filled with NaN.
+    """
+    shape = np.shape(matrix_multipole)
+    if path_multipole_hdf5 not in f5:
+        return f5.create_dataset(
+            path_multipole_hdf5, shape=(nframes, *shape), maxshape=(None, *shape),
+            dtype=np.float32, chunks=(1, *multipole_chunks(matrix_multipole)),
+            compression='lzf', fillvalue=np.nan)
+
+    dset = f5[path_multipole_hdf5]
+    if len(dset) < nframes:
+        dset.resize(nframes, axis=0)
+    return dset
+
+
+def store_multipoles_in_hdf5(
+        path_hdf5: PathLike, path_multipole_hdf5: str, indices: List[int],
+        matrices: List[Matrix]) -> None:
+    """Store the `matrices` as the frames `indices` of the multipole dataset."""
+    with h5py.File(path_hdf5, 'r+') as f5:
+        dset = ensure_multipole_dataset(
+            f5, path_multipole_hdf5, max(indices) + 1, matrices[0])
+        for index, matrix in zip(indices, matrices):
+            dset[index] = matrix
+
+
+def multipoles_in_hdf5(
+        path_hdf5: PathLike, path_multipole_hdf5: str, indices: List[int]) -> List[bool]:
+    """Check which of the frames `indices` of the multipole dataset have been computed."""
+    if is_hdf5_empty(path_hdf5):
+        return [False] * len(indices)
+    with h5py.File(path_hdf5, 'r') as f5:
+        return frames_in_dataset(f5, path_multipole_hdf5, indices)
+
+
+def frames_in_dataset(f5: h5py.File, path_multipole_hdf5: str, indices: List[int]) -> List[bool]:
+    """Check which of the frames `indices` of the multipole dataset in `f5` are computed."""
+    if path_multipole_hdf5 not in f5:
+        return [False] * len(indices)
+    dset = f5[path_multipole_hdf5]
+    # Frames that have not been computed are filled with NaN
+    corner = (0,) * (dset.ndim - 1)
+    return [index < len(dset) and not np.isnan(dset[(index, *corner)])
+            for index in indices]
+
+
 def search_multipole_in_hdf5(
-        path_hdf5: PathLike, path_multipole_hdf5: str, multipole: str) -> Optional[np.ndarray]:
-    """Search if the multipole is already store in the HDF5."""
-    if is_data_in_hdf5(path_hdf5, path_multipole_hdf5):
-        logger.info(f"retrieving multipole: {multipole} from the hdf5")
-        return retrieve_hdf5_data(path_hdf5, path_multipole_hdf5)
-    else:
-        logger.info(f"computing multipole: {multipole}")
-        return None
+        path_hdf5: PathLike, path_multipole_hdf5: str, multipole: str,
+        index: int) -> Optional[np.ndarray]:
+    """Search if the multipole of the frame `index` is already store in the HDF5.
+
+    The tensors of the higher multipoles start with the lower ones, therefore
+    if a higher multipole is stored, the requested one is sliced from it.
+    """
+    root = dirname(path_multipole_hdf5)
+    ncomponents = MULTIPOLE_COMPONENTS[multipole]
+    candidates = [name for name, n in MULTIPOLE_COMPONENTS.items() if n >= ncomponents]
+
+    if not is_hdf5_empty(path_hdf5):
+        with h5py.File(path_hdf5, 'r') as f5:
+            for name in candidates:
+                path = join(root, name)
+                if path not in f5:
+                    continue
+                dset = f5[path]
+                # Frames that have not been computed are filled with NaN
+                if index >= len(dset) or np.isnan(dset[(index, *(0,) * (dset.ndim - 1))]):
+                    continue
+                logger.info(f"retrieving multipole: {multipole} from the {name} in the hdf5")
+                if name == multipole:
+                    return dset[index]
+                elif multipole == 'overlap':
+                    return dset[index, 0]
+                else:
+                    return dset[index, :ncomponents]
+
+    logger.info(f"computing multipole: {multipole}")
+    return None
 
 
 def compute_matrix_multipole(
@@ -101,37 +332,66 @@ def compute_matrix_multipole(
     """
     path_hdf5 = config.path_hdf5
 
-    # Write molecule in temporal file
-    path = join(config.scratch_path, f"molecule_{uuid.uuid4()}.xyz")
-    mol_plams = tuplesXYZ_to_plams(mol)
-    mol_plams.write(path)
+    # Pass the molecule to libint as arrays
+    symbols, coords = MolArrays.from_atoms(mol)
+    symbols = symbols.tolist()
 
     # name of the basis set
     basis_name = config["cp2k_general_settings"]["basis"]
 
+    if multipole == 'quadrupole':
+        logger.debug("super_matrix args: path_hdf5=%s basis=%s multipole=%s",
+                     path_hdf5, basis_name, multipole)
+
+    # For the dipole, the tensor contains the overlap + {x, y, z} dipole matrices.
+    # For the quadrupole, it also contains the {xx, xy, xz, yy, yz, zz} matrices.
+    super_matrix = compute_integrals_multipole_from_arrays(
+        symbols, coords, path_hdf5, basis_name, multipole)
+
+    return reshape_super_matrix(super_matrix, multipole)
+
+
+def compute_multipole_matrices(
+        molecules: List[List[AtomXYZ]], config: DictConfig, multipole: str) -> List[Matrix]:
+    """Compute the `multipole` matrices for several geometries in a single batch.
+
+    Contrary to calling :func:`compute_matrix_multipole` for each geometry, libint2
+    is initialized and the basis set is read from the HDF5 only once.
+
+    Parameters
+    ----------
+    molecules
+        Molecules to compute the multipole
+    config
+        Dictionary with the current configuration
+    multipole
+        kind of multipole to compute
+
+    Returns
+    -------
+    list
+        Matrices with entries <ψi | x^i y^j z^k | ψj> for each molecule
+
+    """
+    arrays = [MolArrays.from_atoms(mol) for mol in molecules]
+    super_matrices = compute_integrals_multipole_batch(
+        [symbols.tolist() for symbols, _ in arrays], [coords for _, coords in arrays],
+        config.path_hdf5, config["cp2k_general_settings"]["basis"], multipole)
+
+    return [reshape_super_matrix(matrix, multipole) for matrix in super_matrices]
+
+
+def reshape_super_matrix(super_matrix: Matrix, multipole: str) -> Matrix:
+    """Reshape the `super_matrix` as a tensor with the overlap and multipole matrices.
+
+    The binding returns the row-major Eigen matrix as a C-contiguous array,
+    therefore the tensor is a view of the `super_matrix` instead of a copy.
+    """
+    assert super_matrix.flags['C_CONTIGUOUS'], "libint binding returned non-contiguous array"
     if multipole == 'overlap':
-        matrix_multipole = compute_integrals_multipole(
-            path, path_hdf5, basis_name, multipole)
-    elif multipole == 'dipole':
-        # The tensor contains the overlap + {x, y, z} dipole matrices
-        super_matrix = compute_integrals_multipole(
-            path, path_hdf5, basis_name, multipole)
-        dim = super_matrix.shape[1]
-
-        # Reshape the super_matrix as a tensor containing overlap + {x, y, z} dipole matrices
-        matrix_multipole = super_matrix.reshape(4, dim, dim)
-
-    elif multipole == 'quadrupole':
-        # The tensor contains the overlap + {xx, xy, xz, yy, yz, zz} quadrupole matrices
-        print("super_matrix: ", path, path_hdf5, basis_name, multipole)
-        super_matrix = compute_integrals_multipole(
-            path, path_hdf5, basis_name, multipole)
-        dim = super_matrix.shape[1]
-
-        # Reshape to 3d tensor containing overlap + {x, y, z} + {xx, xy, xz, yy, yz, zz} quadrupole matrices
-        matrix_multipole = super_matrix.reshape(10, dim, dim)
-
-    # Delete the tmp molecule file
-    os.remove(path)
+        return super_matrix
 
-    return matrix_multipole
+    # overlap + {x, y, z} or overlap + {x, y, z} + {xx, xy, xz, yy, yz, zz}
+    ncomponents = MULTIPOLE_COMPONENTS[multipole]
+    dim = super_matrix.shape[1]
+    return super_matrix.reshape(ncomponents, dim, dim)
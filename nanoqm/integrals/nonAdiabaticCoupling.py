@@ -29,7 +29,7 @@ __all__ = ['calculate_couplings_3points', 'calculate_couplings_levine',
            'compute_overlaps_for_coupling', 'correct_phases']
 
 import os
-import uuid
+import tempfile
 from os.path import join
 from typing import List, Tuple
 
@@ -157,17 +157,11 @@ def calculate_couplings_levine(dt: float, w_jk: Matrix,
 def correct_phases(overlaps: Tensor3D, mtx_phases: Matrix) -> np.ndarray:
     """Correct the phases for all the overlaps."""
     noverlaps = overlaps.shape[0]  # total number of overlap matrices
-    dim = overlaps.shape[1]  # Size of the square matrix
 
-    for k in range(noverlaps):
-        # Extract phases
-        phases_t0, phases_t1 = mtx_phases[k: k + 2]
-        phases_t0 = phases_t0.reshape(dim, 1)
-        phases_t1 = phases_t1.reshape(1, dim)
-        mtx_phases_Sji_t0_t1 = np.dot(phases_t0, phases_t1)
-
-        # Update array with the fixed phases
-        overlaps[k] *= mtx_phases_Sji_t0_t1
+    # Scale the rows with the phases at time t and the columns with the
+    # phases at time t + dt, instead of building the outer product of the phases
+    overlaps *= mtx_phases[:noverlaps, :, np.newaxis]
+    overlaps *= mtx_phases[1:noverlaps + 1, np.newaxis, :]
 
     return overlaps
 
@@ -202,15 +196,14 @@ def compute_overlaps_for_coupling(
     return np.dot(css0.T, np.dot(suv, css1))
 
 
-def read_overlap_data(config: DictConfig, mo_paths: List[str]) -> Tuple[Matrix, Matrix]:
+def read_overlap_data(config: DictConfig, mo_paths: List[str]) -> Tuple[Matrix, ...]:
     """Read the Molecular orbital coefficients."""
     mos = retrieve_hdf5_data(config.path_hdf5, mo_paths)
 
     # Extract a subset of molecular orbitals to compute the coupling
     lowest, highest = compute_range_orbitals(config)
-    css0, css1 = tuple(map(lambda xs: xs[:, lowest: highest], mos))
 
-    return css0, css1
+    return tuple(xs[:, lowest: highest] for xs in mos)
 
 
 def compute_range_orbitals(config: DictConfig) -> Tuple[int, int]:
@@ -229,22 +222,18 @@ def calcOverlapMtx(config: DictConfig, molecules: Tuple[MolXYZ, MolXYZ]) -> Matr
     """
     mol_i, mol_j = tuple(tuplesXYZ_to_plams(x) for x in molecules)
 
-    # unique molecular paths
-    path_i = join(config["scratch_path"],
-                  f"molecule_{uuid.uuid4()}.xyz")
-    path_j = join(config["scratch_path"],
-                  "molecule_{uuid.uuid4()}.xyz")
-
-    # Write the molecules in atomic units
-    mol_i.write(path_i)
-    mol_j.write(path_j)
-
+    # Write the scratch molecules in memory if possible, avoiding a networked scratch
+    in_memory = os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK)
+    scratch_root = '/dev/shm' if in_memory else config["scratch_path"]
     basis_name = config["cp2k_general_settings"]["basis"]
-    try:
+
+    # The folder and the molecules inside are removed even if the computation fails
+    with tempfile.TemporaryDirectory(prefix="molecules_", dir=scratch_root) as tmp:
+        path_i = join(tmp, "molecule_i.xyz")
+        path_j = join(tmp, "molecule_j.xyz")
+        mol_i.write(path_i)
+        mol_j.write(path_j)
         integrals = compute_integrals_couplings(
             path_i, path_j, config["path_hdf5"], basis_name)
-    finally:
-        os.remove(path_i)
-        os.remove(path_j)
 
     return integrals
@@ -9,7 +9,6 @@ API
 __all__ = ["calculate_mos", "create_point_folder",
            "split_file_geometries"]
 
-import fnmatch
 import logging
 import os
 from collections import defaultdict
@@ -17,13 +16,13 @@ from os.path import join
 from typing import (Any, DefaultDict, Dict, List, NamedTuple, Sequence, Tuple,
                     Union)
 
-from more_itertools import chunked
+import h5py
 from noodles import gather, schedule
 from qmflows.common import InfoMO
 from qmflows.type_hints import PathLike, PromisedObject
 from qmflows.warnings_qmflows import SCF_Convergence_Warning
 
-from ..common import (DictConfig, Matrix, is_data_in_hdf5,
+from ..common import (DictConfig, Matrix, is_hdf5_empty,
                       read_cell_parameters_as_array, store_arrays_in_hdf5)
 from .scheduleCP2K import prepare_job_cp2k
 
@@ -78,9 +77,12 @@ def calculate_mos(config: DictConfig) -> List[str]:
     energies = []
     guess_job = None
 
-    # orbital type is either an empty string for restricted calculation
-    # or alpha/beta for unrestricted calculations
-    orbitals_type = config.orbitals_type
+    # Check with a single opening of the HDF5 which points are already stored
+    names = ('eigenvalues', 'coefficients') if config["compute_orbitals"] else ('energy',)
+    stored = points_in_hdf5(
+        config.path_hdf5,
+        [[join(mo_root(config, j + config.enumerate_from), name) for name in names]
+         for j in range(len(config.geometries))])
 
     for j, gs in enumerate(config.geometries):
 
@@ -93,8 +95,7 @@ def calculate_mos(config: DictConfig) -> List[str]:
         dict_input["k"] = k
 
         # Path where the MOs will be store in the HDF5
-        root = join(config.project_name, f'point_{k}',
-                    config.package_name, 'mo', orbitals_type)
+        root = mo_root(config, k)
         dict_input["node_MOs"] = [
             join(
                 root, 'eigenvalues'), join(
@@ -103,11 +104,7 @@ def calculate_mos(config: DictConfig) -> List[str]:
 
         # If the MOs are already store in the HDF5 format return the path
         # to them and skip the calculation
-        if config["compute_orbitals"]:
-            predicate = dict_input["node_MOs"]
-        else:
-            predicate = dict_input["node_energy"]
-        if is_data_in_hdf5(config.path_hdf5, predicate):
+        if stored[j]:
             logger.info(f"point_{k} has already been calculated")
             orbitals.append(dict_input["node_MOs"])
         else:
@@ -161,12 +158,22 @@ def store_molecular_orbitals(
     finally:
         if config.remove_log_file:
             work_dir = promise_qm.archive['work_dir']
-            path_mos = fnmatch.filter(os.listdir(work_dir), 'mo_*MOLog')[0]
-            os.remove(join(work_dir, path_mos))
+            os.remove(find_mo_log_file(work_dir, 'mo_'))
 
     return dict_input["node_MOs"]
 
 
+def find_mo_log_file(work_dir: PathLike, prefix: str) -> str:
+    """Search in `work_dir` for the ascii file containing the MOs printed by CP2K."""
+    work_dir = os.fsdecode(work_dir)
+    with os.scandir(work_dir) as it:
+        for entry in it:
+            if entry.name.startswith(prefix) and entry.name.endswith('MOLog'):
+                return entry.path
+
+    raise FileNotFoundError(f"There is no MOLog file in path: {work_dir}")
+
+
 def save_orbitals_in_hdf5(mos: OrbitalType, config: DictConfig, job_name: str) -> None:
     """Store the orbitals from restricted and unrestricted calculations."""
     if isinstance(mos, InfoMO):
@@ -177,6 +184,24 @@ def save_orbitals_in_hdf5(mos: OrbitalType, config: DictConfig, job_name: str) -
         dump_orbitals_to_hdf5(betas, config, job_name, "betas")
 
 
+def mo_root(config: DictConfig, k: int) -> str:
+    """Return the node in the HDF5 where the MOs of the k-th point are stored.
+
+    The orbital type is either an empty string for restricted calculation
+    or alpha/beta for unrestricted calculations.
+    """
+    return join(config.project_name, f'point_{k}',
+                config.package_name, 'mo', config.orbitals_type)
+
+
+def points_in_hdf5(path_hdf5: PathLike, nodes: List[List[str]]) -> List[bool]:
+    """Check opening the HDF5 only once whether all the `nodes` of each point are stored."""
+    if is_hdf5_empty(path_hdf5):
+        return [False] * len(nodes)
+    with h5py.File(path_hdf5, 'r') as f5:
+        return [all(node in f5 for node in xs) for xs in nodes]
+
+
 def dump_orbitals_to_hdf5(
         data: InfoMO, config: DictConfig, job_name: str, orbitals_type: str = "") -> None:
     """Store the result in HDF5 format.
@@ -195,9 +220,10 @@ def dump_orbitals_to_hdf5(
     """
     root = join("cp2k", "mo", orbitals_type)
 
-    for name, array in zip(("eigenvalues", "coefficients"), (data.eigenvalues, data.eigenvectors)):
-        path_property = join(config.project_name, job_name, root, name)
-        store_arrays_in_hdf5(config.path_hdf5, path_property, array)
+    # Store both properties opening the HDF5 only once
+    paths = [join(config.project_name, job_name, root, name)
+             for name in ("eigenvalues", "coefficients")]
+    store_arrays_in_hdf5(config.path_hdf5, paths, [data.eigenvalues, data.eigenvectors])
 
 
 @schedule
@@ -276,8 +302,7 @@ def schedule_check(
         # Remove the previous ascii file containing the MOs
         msg2 = f"removing file containig the previous failed MOs of {job_name}"
         logger.warning(msg2)
-        path = fnmatch.filter(os.listdir(point_dir), 'mo*MOLog')[0]
-        os.remove(join(point_dir, path))
+        os.remove(find_mo_log_file(point_dir, 'mo'))
 
         # Compute new guess at point k
         config.calc_new_wf_guess_on_points.append(dict_input["k"])
@@ -304,8 +329,9 @@ def split_file_geometries(path_xyz: PathLike) -> Sequence[str]:
     with open(path_xyz) as f:
         xss = f.readlines()
 
-    numat = int(xss[0].split()[0])
-    return list(map(''.join, chunked(xss, numat + 2)))
+    # Each geometry takes the number of atoms plus the header and comment lines
+    nlines = int(xss[0].split()[0]) + 2
+    return [''.join(xss[i: i + nlines]) for i in range(0, len(xss), nlines)]
 
 
 def create_file_names(work_dir: PathLike, i: int) -> JobFiles:
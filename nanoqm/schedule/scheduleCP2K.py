@@ -12,9 +12,7 @@ API
 
 """
 
-import fnmatch
 import os
-from os.path import join
 
 from noodles import schedule  # Workflow Engine
 
@@ -39,10 +37,10 @@ def try_to_read_wf(path_dir: PathLike) -> PathLike:
         If there is not a wave function file.
 
     """
-    xs = os.listdir(path_dir)
-    files = list(filter(lambda x: fnmatch.fnmatch(x, '*wfn'), xs))
-    if files:
-        return join(path_dir, files[0])
+    with os.scandir(os.fsdecode(path_dir)) as it:
+        path_wfn = next((entry.path for entry in it if entry.name.endswith('wfn')), None)
+    if path_wfn is not None:
+        return path_wfn
     else:
         raise RuntimeError(
             f"There are no wave function file in path:{path_dir}")
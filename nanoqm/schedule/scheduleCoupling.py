@@ -22,17 +22,16 @@ import logging
 import os
 from os.path import join
 # Types hint
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from noodles import schedule
-from qmflows.parsers import parse_string_xyz
 from qmflows.type_hints import PathLike
 from scipy.optimize import linear_sum_assignment
 
-from ..common import (DictConfig, Matrix, MolXYZ, Tensor3D, Vector,
+from ..common import (DictConfig, Matrix, MolArrays, MolXYZ, Tensor3D, Vector,
                       femtosec2au, h2ev, is_data_in_hdf5, retrieve_hdf5_data,
-                      store_arrays_in_hdf5)
+                      retrieve_hdf5_tensor, store_arrays_in_hdf5)
 from ..integrals import (calculate_couplings_3points,
                          calculate_couplings_levine,
                          compute_overlaps_for_coupling, correct_phases)
@@ -79,13 +78,11 @@ def lazy_couplings(
             paths_overlaps, config)
     else:
         # Do not track the crossings
-        mtx_0 = retrieve_hdf5_data(config.path_hdf5, paths_overlaps[0])
-        _, dim = mtx_0.shape
         overlaps = np.stack(
             retrieve_hdf5_data(config.path_hdf5, paths_overlaps))
         nOverlaps, nOrbitals, _ = overlaps.shape
         swaps = np.tile(np.arange(nOrbitals), (nOverlaps + 1, 1))
-        mtx_phases = compute_phases(overlaps, nOverlaps, dim)
+        mtx_phases = compute_phases(overlaps, nOverlaps, nOrbitals)
         fixed_phase_overlaps = correct_phases(overlaps, mtx_phases)
 
     # Write the overlaps in text format
@@ -129,19 +126,14 @@ def compute_the_fixed_phase_overlaps(
     path_swaps = join(config.project_name, config.orbitals_type, 'swaps')
 
     # Compute the corrected overlaps if not avaialable in the HDF5
-    all_data_in_hdf5 = all(is_data_in_hdf5(config.path_hdf5, path_data)
-                           for path_data in (paths_corrected_overlaps[0], path_swaps))
+    all_data_in_hdf5 = is_data_in_hdf5(
+        config.path_hdf5, [paths_corrected_overlaps[0], path_swaps])
     if not all_data_in_hdf5:
-        # Compute the dimension of the coupling matrix
-        mtx_0 = retrieve_hdf5_data(config.path_hdf5, paths_overlaps[0])
-        _, dim = mtx_0.shape
+        # Read all the single precision Overlaps into a tensor opening the HDF5 only once
+        overlaps = retrieve_hdf5_tensor(config.path_hdf5, paths_overlaps)
 
-        # Read all the Overlaps
-        overlaps = np.stack([retrieve_hdf5_data(config.path_hdf5, ps)
-                             for ps in paths_overlaps])
-
-        # Number of couplings to compute
-        nCouplings = overlaps.shape[0]
+        # Number of couplings to compute and dimension of the coupling matrix
+        nCouplings, _, dim = overlaps.shape
 
         # Compute the unavoided crossing using the Overlap matrix
         # and correct the swaps between Molecular Orbitals
@@ -164,9 +156,9 @@ def compute_the_fixed_phase_overlaps(
         store_arrays_in_hdf5(config.path_hdf5, path_swaps, swaps, dtype=np.int32)
     else:
         # Read the corrected overlaps and the swaps from the HDF5
-        fixed_phase_overlaps = np.stack(
-            retrieve_hdf5_data(config.path_hdf5, paths_corrected_overlaps))
-        swaps = retrieve_hdf5_data(config.path_hdf5, path_swaps)
+        *corrected_overlaps, swaps = retrieve_hdf5_data(
+            config.path_hdf5, paths_corrected_overlaps + [path_swaps])
+        fixed_phase_overlaps = np.stack(corrected_overlaps)
 
     return fixed_phase_overlaps, swaps
 
@@ -244,7 +236,7 @@ def compute_phases(overlaps: Tensor3D, nCouplings: int,
 
 
 def track_unavoided_crossings(
-        overlaps: Tensor3D, nHOMO: int) -> Tuple[List[Matrix], np.ndarray]:
+        overlaps: Tensor3D, nHOMO: int) -> Tuple[Tensor3D, np.ndarray]:
     """Track the index of the states if there is a crossing.
 
     It uses the algorithm  described at:
@@ -340,21 +332,35 @@ def calculate_overlap(config: DictConfig, mo_paths_hdf5: List[str]) -> List[str]
     overlap_is_done = [check_if_overlap_is_done(
         config, p) for p in all_overlaps_paths]
 
+    # Consecutive overlaps share a point, keep its coefficients to avoid reading them again
+    coefficients_cache: Dict[int, Matrix] = {}
     paths = []
     for i in range(npoints):
         if overlap_is_done[i]:
             p = all_overlaps_paths[i]
         else:
-            p = single_machine_overlaps(config, mo_paths_hdf5, i)
+            p = single_machine_overlaps(config, mo_paths_hdf5, i, coefficients_cache)
         paths.append(p)
 
     return paths
 
 
 def single_machine_overlaps(
-        config: DictConfig, mo_paths_hdf5: List[str], i: int) -> str:
+        config: DictConfig, mo_paths_hdf5: List[str], i: int,
+        coefficients_cache: Optional[Dict[int, Matrix]] = None) -> str:
     """Compute the overlaps in the CPUs avaialable on the local machine.
 
+    Parameters
+    ----------
+    config
+        Configuration of the current job
+    mo_paths_hdf5
+        Node paths to the molecular orbitals in the HDF5
+    i
+        Index of the overlap
+    coefficients_cache
+        Molecular orbital coefficients of the previous overlap, updated in place
+
     Returns
     -------
     str
@@ -363,8 +369,9 @@ def single_machine_overlaps(
     """
     # Data to compute the overlaps
     pair_molecules = select_molecules(config, i)
-    mo_paths = [mo_paths_hdf5[i + j][1] for j in range(2)]
-    coefficients = read_overlap_data(config, mo_paths)
+    coefficients = read_coefficients(
+        config, mo_paths_hdf5, (i, i + 1),
+        {} if coefficients_cache is None else coefficients_cache)
 
     # Compute the overlap
     overlaps = compute_overlaps_for_coupling(
@@ -379,6 +386,25 @@ def single_machine_overlaps(
     return overlaps_paths_hdf5
 
 
+def read_coefficients(
+        config: DictConfig, mo_paths_hdf5: List[str], indices: Tuple[int, int],
+        cache: Dict[int, Matrix]) -> Tuple[Matrix, Matrix]:
+    """Read the coefficients of the points `indices` that are not already in the `cache`.
+
+    Only the coefficients of the given `indices` are kept in the `cache`.
+    """
+    missing = [idx for idx in indices if idx not in cache]
+    if missing:
+        mo_paths = [mo_paths_hdf5[idx][1] for idx in missing]
+        cache.update(zip(missing, read_overlap_data(config, mo_paths)))
+
+    for idx in set(cache).difference(indices):
+        del cache[idx]
+
+    css0, css1 = (cache[idx] for idx in indices)
+    return css0, css1
+
+
 def create_overlap_path(config: DictConfig, i: int) -> str:
     """Create the path inside the HDF5 where the overlap is going to be store."""
     root = join(config.project_name, config.orbitals_type, 'overlaps_{}'.format(
@@ -389,7 +415,7 @@ def create_overlap_path(config: DictConfig, i: int) -> str:
 def select_molecules(config: DictConfig, i: int) -> Tuple[MolXYZ, MolXYZ]:
     """Select the pairs of molecules to compute the couplings."""
     k = 0 if config.overlaps_deph else i
-    return tuple(parse_string_xyz(config.geometries[idx]) for idx in (k, i + 1))
+    return tuple(MolArrays.from_string(config.geometries[idx]).to_atoms() for idx in (k, i + 1))
 
 
 def check_if_overlap_is_done(config: DictConfig, overlaps_paths_hdf5: str) -> bool:
@@ -404,8 +430,8 @@ def check_if_overlap_is_done(config: DictConfig, overlaps_paths_hdf5: str) -> bo
 
 def write_hamiltonians(
         config: DictConfig,
-        crossing_and_couplings: Tuple[np.ndarray, List[Matrix]],
-        mo_paths_hdf5: List[str]) -> List[Tuple[str, str]]:
+        crossing_and_couplings: Tuple[np.ndarray, List[str]],
+        mo_paths_hdf5: List[List[str]]) -> List[Tuple[str, str]]:
     """Write the real and imaginary components of the hamiltonian.
 
     It uses both the orbitals energies and the derivative coupling accoring to:
@@ -435,17 +461,8 @@ def write_hamiltonians(
     def write_pyxaid_format(arr, fileName):
         np.savetxt(fileName, arr, fmt='%10.5e', delimiter='  ')
 
-    def write_data(i):
+    def write_data(i, css, energies_t0, energies_t1):
         j = i + config.enumerate_from
-        path_coupling = path_couplings[i]
-        css = retrieve_hdf5_data(config.path_hdf5, path_coupling)
-
-        # Extract the energy values at time t
-        # The first coupling is compute at time t + dt
-        # Then I'm shifting the energies dt to get the correct value
-        energies_t0 = retrieve_hdf5_data(config.path_hdf5, mo_paths_hdf5[i][0])
-        energies_t1 = retrieve_hdf5_data(
-            config.path_hdf5, mo_paths_hdf5[i + 1][0])
 
         # Return the average between time t and t + dt
         energies = np.average((energies_t0, energies_t1), axis=0)
@@ -479,7 +496,17 @@ def write_hamiltonians(
 
     # The couplings are compute at time t + dt therefore
     # we associate the energies at time t + dt with the corresponding coupling
-    return [write_data(i) for i in range(config.npoints)]
+    # The energies at time t + dt are reused as the energies at time t of the next point
+    energies_t0 = retrieve_hdf5_data(config.path_hdf5, mo_paths_hdf5[0][0])
+    files_hamiltonians = []
+    for i in range(config.npoints):
+        # Read the coupling and the energies at time t + dt opening the HDF5 only once
+        css, energies_t1 = retrieve_hdf5_data(
+            config.path_hdf5, [path_couplings[i], mo_paths_hdf5[i + 1][0]])
+        files_hamiltonians.append(write_data(i, css, energies_t0, energies_t1))
+        energies_t0 = energies_t1
+
+    return files_hamiltonians
 
 
 def swap_columns(arr: Matrix, swaps_t: Vector) -> Matrix:
@@ -489,8 +516,7 @@ def swap_columns(arr: Matrix, swaps_t: Vector) -> Matrix:
 
 def write_overlaps_in_ascii(overlaps: Tensor3D) -> None:
     """Write the corrected overlaps in text files."""
-    if not os.path.isdir('overlaps'):
-        os.mkdir('overlaps')
+    os.makedirs('overlaps', exist_ok=True)
 
     # write overlaps
     nframes = overlaps.shape[0]
@@ -18,24 +18,30 @@ import fnmatch
 import getpass
 import logging
 import os
-import subprocess
+import sys
 import tempfile
+from functools import lru_cache, partial
 from os.path import join
 from pathlib import Path
 from subprocess import PIPE, Popen
-from typing import List, Union
+from typing import List, Tuple, Union
 
+import h5py
 import numpy as np
-import pkg_resources
 from qmflows.parsers import parse_string_xyz
 from qmflows.parsers.cp2KParser import readCp2KBasis
 from qmflows.type_hints import PathLike
 
 from ..common import (BasisFormats, DictConfig, Matrix, change_mol_units,
-                      is_data_in_hdf5, retrieve_hdf5_data,
+                      is_data_in_hdf5, is_hdf5_empty, retrieve_hdf5_data,
                       store_arrays_in_hdf5)
 from ..schedule.components import create_point_folder, split_file_geometries
 
+if sys.version_info >= (3, 9):
+    from importlib.resources import as_file, files
+else:
+    from importlib_resources import as_file, files
+
 # Starting logger
 logger = logging.getLogger(__name__)
 
@@ -61,12 +67,11 @@ def initialize(config: DictConfig) -> DictConfig:
     config['workdir'] = scratch_path
 
     # If the directory does not exist create it
-    if not scratch_path.exists():
-        scratch_path.mkdir(parents=True)
+    scratch_path.mkdir(parents=True, exist_ok=True)
 
-    # Touch HDF5 if it doesn't exists
-    if not os.path.exists(config.path_hdf5):
-        Path(config.path_hdf5).touch()
+    # Create a valid HDF5 if it doesn't exists or it is an empty placeholder
+    if is_hdf5_empty(config.path_hdf5):
+        h5py.File(config.path_hdf5, 'w').close()
 
     # all_geometries type :: [String]
     geometries = split_file_geometries(config["path_traj_xyz"])
@@ -95,14 +100,22 @@ def initialize(config: DictConfig) -> DictConfig:
 
 def save_basis_to_hdf5(config: DictConfig) -> None:
     """Store the specification of the basis set in the HDF5 to compute the integrals."""
-    path_basis = pkg_resources.resource_filename("nanoqm", "basis/BASIS_MOLOPT")
-    if not is_data_in_hdf5(config.path_hdf5, path_basis):
-        store_cp2k_basis(config.path_hdf5, path_basis)
+    if not is_data_in_hdf5(config.path_hdf5, "cp2k/basis"):
+        # Make sure that the basis is a file on disk, even for zipped packages
+        with as_file(files("nanoqm") / "basis" / "BASIS_MOLOPT") as path_basis:
+            store_cp2k_basis(config.path_hdf5, path_basis)
+
+
+@lru_cache(maxsize=None)
+def _read_cp2k_basis(path_basis: str, mtime: int) -> Tuple[list, list]:
+    """Parse (only once per path and modification time) a CP2K basis set file."""
+    return readCp2KBasis(path_basis)
 
 
 def store_cp2k_basis(path_hdf5: PathLike, path_basis: PathLike) -> None:
     """Read the CP2K basis set into an HDF5 file."""
-    keys, vals = readCp2KBasis(path_basis)
+    keys, vals = _read_cp2k_basis(
+        os.fspath(path_basis), os.stat(path_basis).st_mtime_ns)
     node_paths_exponents = [join("cp2k/basis", xs.atom, xs.basis, "exponents")
                             for xs in keys]
     node_paths_coefficients = [
@@ -165,15 +178,14 @@ def split_trajectory(path: PathLike, nblocks: int, pathOut: PathLike) -> List[st
         list of paths to the xyz geometries
 
     """
-    with open(path, 'r') as f:
+    with open(path, 'rb') as f:
         # Read First line
         ls = f.readline()
         numat = int(ls.split()[0])
-
-    # Number of lines in the file
-    cmd = f"wc -l {path}"
-    ls = subprocess.check_output(cmd.split()).decode()
-    lines = int(ls.split()[0])
+        # Number of lines in the file, counted with the already opened
+        # handle instead of spawning `wc -l` to read the whole file again
+        lines = 1 + sum(
+            block.count(b'\n') for block in iter(partial(f.read, 2 ** 20), b''))
     if (lines % (numat + 2)) != 0:
         lines += 1
 
@@ -206,8 +218,8 @@ def log_config(config: DictConfig) -> None:
     handler = logging.StreamHandler()
     handler.terminator = ""
 
-    version = pkg_resources.get_distribution('nano-qmflows').version
-    path = pkg_resources.resource_filename('nanoqm', '')
+    version = package_version()
+    path = files('nanoqm')
 
     logger.info(f"Using nano-qmflows version: {version} ")
     logger.info(f"nano-qmflows path is: {path}")
@@ -215,6 +227,16 @@ def log_config(config: DictConfig) -> None:
     logger.info(f"Data will be stored in HDF5 file: {config.path_hdf5}")
 
 
+def package_version() -> str:
+    """Return the installed version of nano-qmflows."""
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python < 3.8
+        import pkg_resources
+        return pkg_resources.get_distribution('nano-qmflows').version
+    return version('nano-qmflows')
+
+
 def create_path_option(path: str) -> Union[Path, None]:
     """Create a Path object or return None if path is None."""
     return Path(path) if path is not None else None
@@ -32,7 +32,7 @@ from .schemas import (schema_absorption_spectrum, schema_coop,
                       schema_distribute_derivative_couplings,
                       schema_distribute_single_points, schema_ipr,
                       schema_single_points)
-from .templates import create_settings_from_template, valence_electrons
+from .templates import create_settings_from_template, read_valence_electrons_by_basis
 
 logger = logging.getLogger(__name__)
 
@@ -164,9 +164,9 @@ class InputSanitizer:
         basis = self.general['basis']
         charge = self.general['charge']
         mol = Molecule(self.user_input["path_traj_xyz"], 'xyz')
+        valence_electrons = read_valence_electrons_by_basis()[basis]
 
-        number_of_electrons = sum(
-            valence_electrons['-'.join((at.symbol, basis))] for at in mol.atoms)
+        number_of_electrons = sum(valence_electrons[at.symbol] for at in mol.atoms)
 
         # Correct for total charge of the system
         number_of_electrons = number_of_electrons - charge
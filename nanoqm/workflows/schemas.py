@@ -23,12 +23,27 @@ __all__ = [
     'schema_coop']
 
 import os
+import sys
 from numbers import Real
 from typing import Any, Dict, Iterable
 
-import pkg_resources as pkg
 from schema import And, Optional, Or, Regex, Schema, Use
 
+if sys.version_info >= (3, 9):
+    from importlib.resources import files
+else:
+    from importlib_resources import files
+
+
+def package_basis_path() -> str:
+    """Return the folder containing the basis sets shipped with nano-qmflows.
+
+    CP2K reads the basis from disk, therefore a real path is only available if the
+    package is installed as a plain folder, otherwise ``path_basis`` fails to validate.
+    """
+    path = files("nanoqm") / "basis"
+    return os.fspath(path) if isinstance(path, os.PathLike) else str(path)
+
 
 def equal_lambda(name: str) -> And:
     """Create an schema checking that the keyword matches the expected value."""
@@ -79,7 +94,7 @@ schema_cp2k_general_settings = Schema({
     Optional("cell_angles"): list,
 
     # Path to the folder containing the basis set specifications
-    Optional("path_basis", default=pkg.resource_filename("nanoqm", "basis")): os.path.isdir,
+    Optional("path_basis", default=package_basis_path()): os.path.isdir,
 
     # Settings describing the input of the quantum package
     "cp2k_settings_main": object,
@@ -260,6 +275,10 @@ dict_absorption_spectrum = {
     # Interval between MD points where the oscillators are computed"
     Optional("stride", default=1): int,
 
+    # Compute the excited states of the frames through noodles or
+    # concurrently in a pool of threads
+    Optional("parallel_backend", default="noodles"): any_lambda(("noodles", "threads")),
+
     # description: Exchange-correlation functional used in the DFT
     # calculations,
     Optional("xc_dft", default="pbe"): str
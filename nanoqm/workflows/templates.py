@@ -10,25 +10,46 @@ Index
 
 __all__ = ["create_settings_from_template"]
 
+import copy
 import json
 import os
+import sys
+from functools import lru_cache
 from os.path import join
 
-import pkg_resources as pkg
-import yaml
-from scm.plams import Molecule
-
 from qmflows.settings import Settings
 from qmflows.type_hints import PathLike
-from typing import Any, Dict, Iterable, FrozenSet
+from typing import Any, Dict, Iterable, FrozenSet, List
+
+if sys.version_info >= (3, 9):
+    from importlib.resources import files
+else:
+    from importlib_resources import files
+
+
+@lru_cache(maxsize=1)
+def read_valence_electrons() -> Dict[str, int]:
+    """Read (only once) the valence electrons for each element-basis pair."""
+    with (files("nanoqm") / "basis" / "valence_electrons.json").open("r") as f:
+        return json.load(f)
+
 
-path_valence_electrons = pkg.resource_filename(
-    "nanoqm", "basis/valence_electrons.json")
-path_aux_fit = pkg.resource_filename("nanoqm", "basis/aux_fit.json")
+@lru_cache(maxsize=1)
+def read_valence_electrons_by_basis() -> Dict[str, Dict[str, int]]:
+    """Group (only once) the valence electrons by basis, e.g. ``{basis: {element: q}}``."""
+    valence_electrons: Dict[str, Dict[str, int]] = {}
+    for key, q in read_valence_electrons().items():
+        # The key is the element followed by the basis name, e.g. Ag-DZVP-MOLOPT-SR-GTH
+        element, basis = key.split('-', 1)
+        valence_electrons.setdefault(basis, {})[element] = q
+    return valence_electrons
 
-with open(path_valence_electrons, 'r') as f1, open(path_aux_fit, 'r') as f2:
-    valence_electrons = json.load(f1)
-    aux_fit = json.load(f2)
+
+@lru_cache(maxsize=1)
+def read_aux_fit() -> Dict[str, List[int]]:
+    """Read (only once) the auxiliary basis CFIT numbers for each element."""
+    with (files("nanoqm") / "basis" / "aux_fit.json").open("r") as f:
+        return json.load(f)
 
 
 def generate_auxiliar_basis(
@@ -40,6 +61,7 @@ def generate_auxiliar_basis(
     quality_to_number = {"low": 0, "medium": 1,
                          "good": 2, "verygood": 3, "excellent": 4}
     kind = sett.cp2k.force_eval.subsys.kind
+    aux_fit = read_aux_fit()
     for atom in kind.keys():
         index = quality_to_number[quality.lower()]
         cfit = aux_fit[atom][index]
@@ -49,289 +71,231 @@ def generate_auxiliar_basis(
 
 
 #: Settings for a PBE calculation to compute a guess wave function
-cp2k_pbe_guess = Settings(yaml.load("""
-cp2k:
-  global:
-    run_type:
-      energy
-  force_eval:
-    subsys:
-      cell:
-        periodic: "None"
-    dft:
-      xc:
-        xc_functional pbe: {}
-      scf:
-        eps_scf: 1e-6
-        added_mos: 0
-        scf_guess: "restart"
-        ot:
-          minimizer: "DIIS"
-          n_diis: 7
-          preconditioner: "FULL_SINGLE_INVERSE"
-""", Loader=yaml.FullLoader))
+cp2k_pbe_guess = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'xc': {'xc_functional pbe': {}},
+                'scf': {
+                    'eps_scf': '1e-6',
+                    'added_mos': 0,
+                    'scf_guess': 'restart',
+                    'ot': {
+                        'minimizer': 'DIIS',
+                        'n_diis': 7,
+                        'preconditioner': 'FULL_SINGLE_INVERSE'}}}}}})
 
 #: Settings for a PBE calculation to compute the Molecular orbitals
-cp2k_pbe_main = Settings(yaml.load("""
-cp2k:
-  global:
-    run_type:
-      energy
-
-  force_eval:
-    subsys:
-      cell:
-        periodic: "None"
-    dft:
-      xc:
-        xc_functional pbe: {}
-      scf:
-        eps_scf: 5e-4
-        max_scf: 200
-        scf_guess: "restart"
-""", Loader=yaml.FullLoader))
+cp2k_pbe_main = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'xc': {'xc_functional pbe': {}},
+                'scf': {
+                    'eps_scf': '5e-4',
+                    'max_scf': 200,
+                    'scf_guess': 'restart'}}}}})
 
 #: Settings for a PBE0 calculation to compute a guess wave function
-cp2k_pbe0_guess = Settings(yaml.load("""
-cp2k:
-   global:
-     run_type:
-       energy
-
-   force_eval:
-     subsys:
-       cell:
-         periodic: "None"
-     dft:
-       auxiliary_density_matrix_method:
-         method: "basis_projection"
-         admm_purification_method: "none"
-       qs:
-         method: "gpw"
-         eps_pgf_orb: 1E-8
-       xc:
-        xc_functional:
-          pbe:
-            scale_x: 0.75
-            scale_c: 1.00
-        hf:
-          fraction: 0.25
-          screening:
-            eps_schwarz: 1.0E-6
-            screen_on_initial_p: "True"
-          interaction_potential:
-            potential_type: "truncated"
-            cutoff_radius: 2.5
-          memory:
-            max_memory: 5000
-            eps_storage_scaling: "0.1"
-       scf:
-          eps_scf: 1e-6
-          added_mos: 0
-          scf_guess: "restart"
-          ot:
-            minimizer: "DIIS"
-            n_diis: 7
-            preconditioner: "FULL_SINGLE_INVERSE"
-
-""", Loader=yaml.FullLoader))
+cp2k_pbe0_guess = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'auxiliary_density_matrix_method': {
+                    'method': 'basis_projection',
+                    'admm_purification_method': 'none'},
+                'qs': {'method': 'gpw', 'eps_pgf_orb': '1E-8'},
+                'xc': {
+                    'xc_functional': {
+                        'pbe': {'scale_x': 0.75, 'scale_c': 1.0}},
+                    'hf': {
+                        'fraction': 0.25,
+                        'screening': {
+                            'eps_schwarz': 1e-06,
+                            'screen_on_initial_p': 'True'},
+                        'interaction_potential': {
+                            'potential_type': 'truncated',
+                            'cutoff_radius': 2.5},
+                        'memory': {
+                            'max_memory': 5000,
+                            'eps_storage_scaling': '0.1'}}},
+                'scf': {
+                    'eps_scf': '1e-6',
+                    'added_mos': 0,
+                    'scf_guess': 'restart',
+                    'ot': {
+                        'minimizer': 'DIIS',
+                        'n_diis': 7,
+                        'preconditioner': 'FULL_SINGLE_INVERSE'}}}}}})
 
 #: Settings for a PBE0 calculation to compute the Molecular orbitals
-cp2k_pbe0_main = Settings(yaml.load("""
-cp2k:
-   global:
-     run_type:
-       energy
-
-   force_eval:
-     subsys:
-       cell:
-         periodic: "None"
-     dft:
-       auxiliary_density_matrix_method:
-         method: "basis_projection"
-         admm_purification_method: "none"
-       qs:
-         method: "gpw"
-         eps_pgf_orb: "1.0E-8"
-       xc:
-         xc_functional:
-           pbe:
-             scale_x: "0.75"
-             scale_c: "1.00"
-         hf:
-           fraction: "0.25"
-           screening:
-             eps_schwarz: 1.0E-6
-             screen_on_initial_p: "True"
-           interaction_potential:
-             potential_type: "truncated"
-             cutoff_radius: 2.5
-           memory:
-             max_memory: "5000"
-             eps_storage_scaling: "0.1"
-       scf:
-          eps_scf: 5e-4
-          max_scf: 200
-          scf_guess: "restart"
-""", Loader=yaml.FullLoader))
+cp2k_pbe0_main = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'auxiliary_density_matrix_method': {
+                    'method': 'basis_projection',
+                    'admm_purification_method': 'none'},
+                'qs': {'method': 'gpw', 'eps_pgf_orb': '1.0E-8'},
+                'xc': {
+                    'xc_functional': {
+                        'pbe': {'scale_x': '0.75', 'scale_c': '1.00'}},
+                    'hf': {
+                        'fraction': '0.25',
+                        'screening': {
+                            'eps_schwarz': 1e-06,
+                            'screen_on_initial_p': 'True'},
+                        'interaction_potential': {
+                            'potential_type': 'truncated',
+                            'cutoff_radius': 2.5},
+                        'memory': {
+                            'max_memory': '5000',
+                            'eps_storage_scaling': '0.1'}}},
+                'scf': {
+                    'eps_scf': '5e-4',
+                    'max_scf': 200,
+                    'scf_guess': 'restart'}}}}})
 
 #: Settings for a HSE06 calculation to compute a guess wave function
-cp2k_hse06_guess = Settings(yaml.load("""
-cp2k:
-   global:
-     run_type:
-       energy
-
-   force_eval:
-     subsys:
-       cell:
-         periodic: "None"
-     dft:
-       auxiliary_density_matrix_method:
-         method: "basis_projection"
-         admm_purification_method: "none"
-       qs:
-         method: "gpw"
-         eps_pgf_orb: 1E-8
-       xc:
-        xc_functional:
-          pbe:
-            scale_x: 0.00
-            scale_c: 1.00
-          xwpbe:
-            scale_x: -0.25
-            scale_x0: 1.00
-            omega: 0.11
-        hf:
-          fraction: 0.25
-          screening:
-            eps_schwarz: 1.0E-6
-            screen_on_initial_p: "True"
-          interaction_potential:
-            potential_type: "shortrange"
-            omega: 0.11
-          memory:
-            max_memory: 5000
-            eps_storage_scaling: "0.1"
-       scf:
-          eps_scf: 1e-6
-          added_mos: 0
-          scf_guess: "restart"
-          ot:
-            minimizer: "DIIS"
-            n_diis: 7
-            preconditioner: "FULL_SINGLE_INVERSE"
-
-""", Loader=yaml.FullLoader))
+cp2k_hse06_guess = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'auxiliary_density_matrix_method': {
+                    'method': 'basis_projection',
+                    'admm_purification_method': 'none'},
+                'qs': {'method': 'gpw', 'eps_pgf_orb': '1E-8'},
+                'xc': {
+                    'xc_functional': {
+                        'pbe': {'scale_x': 0.0, 'scale_c': 1.0},
+                        'xwpbe': {
+                            'scale_x': -0.25,
+                            'scale_x0': 1.0,
+                            'omega': 0.11}},
+                    'hf': {
+                        'fraction': 0.25,
+                        'screening': {
+                            'eps_schwarz': 1e-06,
+                            'screen_on_initial_p': 'True'},
+                        'interaction_potential': {'potential_type': 'shortrange', 'omega': 0.11},
+                        'memory': {
+                            'max_memory': 5000,
+                            'eps_storage_scaling': '0.1'}}},
+                'scf': {
+                    'eps_scf': '1e-6',
+                    'added_mos': 0,
+                    'scf_guess': 'restart',
+                    'ot': {
+                        'minimizer': 'DIIS',
+                        'n_diis': 7,
+                        'preconditioner': 'FULL_SINGLE_INVERSE'}}}}}})
 
 #: Settings for a HSE06 calculation to compute the Molecular orbitals
-cp2k_hse06_main = Settings(yaml.load("""
-cp2k:
-   global:
-     run_type:
-       energy
-
-   force_eval:
-     subsys:
-       cell:
-         periodic: "None"
-     dft:
-       auxiliary_density_matrix_method:
-         method: "basis_projection"
-         admm_purification_method: "none"
-       qs:
-         method: "gpw"
-         eps_pgf_orb: "1.0E-8"
-       xc:
-        xc_functional:
-          pbe:
-            scale_x: 0.00
-            scale_c: 1.00
-          xwpbe:
-            scale_x: -0.25
-            scale_x0: 1.00
-            omega: 0.11
-        hf:
-          fraction: 0.25
-          screening:
-            eps_schwarz: 1.0E-6
-            screen_on_initial_p: "True"
-          interaction_potential:
-            potential_type: "shortrange"
-            omega: 0.11
-          memory:
-            max_memory: 5000
-            eps_storage_scaling: "0.1"
-       scf:
-          eps_scf: 1e-6
-          max_scf: 200
-          scf_guess: "restart"
-""", Loader=yaml.FullLoader))
+cp2k_hse06_main = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'auxiliary_density_matrix_method': {
+                    'method': 'basis_projection',
+                    'admm_purification_method': 'none'},
+                'qs': {'method': 'gpw', 'eps_pgf_orb': '1.0E-8'},
+                'xc': {
+                    'xc_functional': {
+                        'pbe': {'scale_x': 0.0, 'scale_c': 1.0},
+                        'xwpbe': {
+                            'scale_x': -0.25,
+                            'scale_x0': 1.0,
+                            'omega': 0.11}},
+                    'hf': {
+                        'fraction': 0.25,
+                        'screening': {
+                            'eps_schwarz': 1e-06,
+                            'screen_on_initial_p': 'True'},
+                        'interaction_potential': {'potential_type': 'shortrange', 'omega': 0.11},
+                        'memory': {
+                            'max_memory': 5000,
+                            'eps_storage_scaling': '0.1'}}},
+                'scf': {
+                    'eps_scf': '1e-6',
+                    'max_scf': 200,
+                    'scf_guess': 'restart'}}}}})
 
 #: Settings for a B3LYP calculation to compute a guess wave function
-cp2k_b3lyp_guess = Settings(yaml.load("""
-cp2k:
-   global:
-      run_type:
-         energy
-
-   force_eval:
-      subsys:
-         cell:
-           periodic: "None"
-      dft:
-         xc:
-           xc_functional b3lyp: {}
-         scf:
-           eps_scf: 1e-6
-           added_mos: 0
-           scf_guess: "restart"
-           ot:
-             minimizer: "DIIS"
-             n_diis: 7
-             preconditioner: "FULL_SINGLE_INVERSE"
-""", Loader=yaml.FullLoader))
+cp2k_b3lyp_guess = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'xc': {'xc_functional b3lyp': {}},
+                'scf': {
+                    'eps_scf': '1e-6',
+                    'added_mos': 0,
+                    'scf_guess': 'restart',
+                    'ot': {
+                        'minimizer': 'DIIS',
+                        'n_diis': 7,
+                        'preconditioner': 'FULL_SINGLE_INVERSE'}}}}}})
 
 #: Settings for a B3LYP calculation to compute the Molecular orbitals
-cp2k_b3lyp_main = Settings(yaml.load("""
-cp2k:
-  global:
-    run_type:
-      energy
-
-  force_eval:
-    subsys:
-      cell:
-        periodic: "None"
-    dft:
-      xc:
-        xc_functional b3lyp: {}
-      scf:
-        eps_scf: 5e-4
-        max_scf: 200
-        scf_guess: "restart"
-""", Loader=yaml.FullLoader))
+cp2k_b3lyp_main = Settings({
+    'cp2k': {
+        'global': {'run_type': 'energy'},
+        'force_eval': {
+            'subsys': {
+                'cell': {'periodic': 'None'}},
+            'dft': {
+                'xc': {'xc_functional b3lyp': {}},
+                'scf': {
+                    'eps_scf': '5e-4',
+                    'max_scf': 200,
+                    'scf_guess': 'restart'}}}}})
 
 
 #: Settings to add the CP2K kinds for each atom
-kinds_template = Settings(yaml.load("""
-cp2k:
-  force_eval:
-    subsys:
-      kind:
-        C:
-          basis_set: DZVP-MOLOPT-SR-GTH-q4
-          potential: GTH-PBE-q4
-""", Loader=yaml.FullLoader))
+kinds_template = Settings({
+    'cp2k': {
+        'force_eval': {
+            'subsys': {
+                'kind': {
+                    'C': {
+                        'basis_set': 'DZVP-MOLOPT-SR-GTH-q4',
+                        'potential': 'GTH-PBE-q4'}}}}}})
 
 
 def generate_kinds(elements: Iterable[str], basis: str, potential: str) -> Settings:
     """Generate the kind section for cp2k basis."""
+    # The cached Settings are shared, modify a copy instead
+    return copy.deepcopy(_generate_kinds(frozenset(elements), basis, potential))
+
+
+@lru_cache(maxsize=32)
+def _generate_kinds(elements: FrozenSet[str], basis: str, potential: str) -> Settings:
+    """Generate (only once per unique set of elements) the kind section for cp2k basis."""
     s = Settings()
     subsys = s.cp2k.force_eval.subsys
+    valence_electrons = read_valence_electrons_by_basis()[basis]
     for e in elements:
-        q = valence_electrons['-'.join((e, basis))]
+        q = valence_electrons[e]
         subsys.kind[e]['basis_set'] = [f"{basis}-q{q}"]
         subsys.kind[e]['potential'] = f"{potential}-q{q}"
 
@@ -367,7 +331,9 @@ def create_settings_from_template(
 
 
 def read_unique_atomic_labels(path_traj_xyz: PathLike) -> FrozenSet[str]:
-    """Return the unique atomic labels."""
-    mol = Molecule(path_traj_xyz, 'xyz')
-
-    return frozenset(at.symbol for at in mol.atoms)
+    """Return the unique atomic labels of the first geometry in the trajectory."""
+    with open(path_traj_xyz, 'r') as f:
+        natoms = int(f.readline().split()[0])
+        # skip the comment line
+        f.readline()
+        return frozenset(f.readline().split()[0].capitalize() for _ in range(natoms))
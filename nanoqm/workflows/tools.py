@@ -16,8 +16,8 @@ def compute_single_point_eigenvalues_coefficients(config: DictConfig):
     node_path_coefficients = f'{config.project_name}/point_0/cp2k/mo/coefficients'
     node_path_eigenvalues = f'{config.project_name}/point_0/cp2k/mo/eigenvalues'
 
-    node_paths = (node_path_coefficients, node_path_eigenvalues)
-    if all(is_data_in_hdf5(config.path_hdf5, x) for x in node_paths):
+    node_paths = [node_path_coefficients, node_path_eigenvalues]
+    if is_data_in_hdf5(config.path_hdf5, node_paths):
         LOGGER.info("Coefficients and eigenvalues already in hdf5.")
     else:
         # Call the single point workflow to calculate the eigenvalues and
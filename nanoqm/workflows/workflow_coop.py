@@ -18,7 +18,7 @@ from qmflows.parsers.xyzParser import readXYZ
 
 from ..common import (DictConfig, MolXYZ, h2ev,
                       number_spherical_functions_per_atom, retrieve_hdf5_data)
-from ..integrals.multipole_matrices import compute_matrix_multipole
+from ..integrals.multipole_matrices import get_overlap_matrix
 from .initialization import initialize
 from .tools import compute_single_point_eigenvalues_coefficients
 
@@ -89,7 +89,7 @@ def compute_overlap_and_atomic_orbitals(
     Computes the overlap matrix, containing only the elements related to those two elements.
     """
     # Computing the overlap-matrix S
-    overlap = compute_matrix_multipole(mol, config, 'overlap')
+    overlap = get_overlap_matrix(config, mol)
 
     # Computing number of spherical orbitals per atom
     sphericals = number_spherical_functions_per_atom(
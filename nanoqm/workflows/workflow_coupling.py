@@ -90,7 +90,6 @@ def create_path_hamiltonians(workdir: PathLike, orbitals_type: str) -> PathLike:
     prefix = "hamiltonians"
     name = prefix if not orbitals_type else f"{orbitals_type}_{prefix}"
     path_hamiltonians = join(workdir, name)
-    if not os.path.exists(path_hamiltonians):
-        os.makedirs(path_hamiltonians)
+    os.makedirs(path_hamiltonians, exist_ok=True)
 
     return path_hamiltonians
@@ -12,13 +12,12 @@ __all__ = ['workflow_ipr']
 import logging
 
 import numpy as np
-from scipy.linalg import sqrtm
 
 from qmflows.parsers.xyzParser import readXYZ
 
 from ..common import (DictConfig, h2ev, number_spherical_functions_per_atom,
-                      retrieve_hdf5_data)
-from ..integrals.multipole_matrices import compute_matrix_multipole
+                      retrieve_hdf5_data, sqrt_symmetric_matrix)
+from ..integrals.multipole_matrices import get_overlap_matrix
 from .initialization import initialize
 from .tools import compute_single_point_eigenvalues_coefficients
 
@@ -48,8 +47,8 @@ def workflow_ipr(config: DictConfig) -> np.ndarray:
     mol = readXYZ(config.path_traj_xyz)
 
     # Computing the overlap-matrix S and its square root
-    overlap = compute_matrix_multipole(mol, config, 'overlap')
-    squared_overlap = sqrtm(overlap)
+    overlap = get_overlap_matrix(config, mol)
+    squared_overlap = sqrt_symmetric_matrix(overlap)
 
     # Converting the coeficients from AO-basis to MO-basis
     transformed_orbitals = np.dot(squared_overlap, atomic_orbitals)
@@ -67,11 +66,9 @@ def workflow_ipr(config: DictConfig) -> np.ndarray:
     accumulated_transf_orbitals = np.add.reduceat(transformed_orbitals, indices, 0)
 
     # Finally, we can calculate the IPR
-    ipr = np.zeros(accumulated_transf_orbitals.shape[1])
-
-    for i in range(accumulated_transf_orbitals.shape[1]):
-        ipr[i] = np.sum(np.absolute(accumulated_transf_orbitals[:, i])**4) / \
-            (np.sum(np.absolute(accumulated_transf_orbitals[:, i])**2))**2
+    abs_transf_orbitals = np.absolute(accumulated_transf_orbitals)
+    ipr = np.sum(abs_transf_orbitals ** 4, axis=0) / \
+        np.sum(abs_transf_orbitals ** 2, axis=0) ** 2
 
     # Lastly, we save the output as a txt-file
     result = np.zeros((accumulated_transf_orbitals.shape[1], 2))
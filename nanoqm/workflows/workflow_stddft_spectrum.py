@@ -10,28 +10,34 @@ Index
 __all__ = ['workflow_stddft']
 
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join
 
 import numpy as np
 from noodles import gather, schedule, unpack
-from scipy.linalg import sqrtm
 from scipy.spatial.distance import cdist
 
 from qmflows import run
-from qmflows.parsers import parse_string_xyz
-from qmflows.type_hints import PathLike
 
-from ..common import (DictConfig, angs2au, change_mol_units, h2ev, hardness,
-                      is_data_in_hdf5, number_spherical_functions_per_atom,
-                      retrieve_hdf5_data, store_arrays_in_hdf5, xc)
-from ..integrals.multipole_matrices import get_multipole_matrix
+from ..common import (DictConfig, MolArrays, MolXYZ, angs2au, change_mol_units, h2ev,
+                      hardness, is_data_in_hdf5, number_spherical_functions_per_atom,
+                      retrieve_hdf5_data, sqrt_symmetric_matrix,
+                      store_arrays_in_hdf5, xc)
+from ..integrals.multipole_matrices import (get_multipole_matrix,
+                                            precompute_multipole_matrices)
 from ..schedule.components import calculate_mos
 from .initialization import initialize
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 # Starting logger
 logger = logging.getLogger(__name__)
 
+#: Serialize the access to the HDF5 file, since HDF5 refuses to open a file for
+#: writing while another handle has it open, e.g. when the frames run in threads
+HDF5_LOCK = threading.Lock()
+
 
 def workflow_stddft(config: DictConfig) -> None:
     """Compute the excited states using simplified TDDFT."""
@@ -42,30 +48,95 @@ def workflow_stddft(config: DictConfig) -> None:
     mo_paths_hdf5, energy_paths_hdf5 = unpack(calculate_mos(config), 2)
 
     # Read structures
-    molecules_au = [change_mol_units(parse_string_xyz(gs))
-                    for i, gs in enumerate(config.geometries)
-                    if (i % config.stride) == 0]
-
-    # Noodles promised call
-    scheduleTDDFT = schedule(compute_excited_states_tddft)
+    arrays = [MolArrays.from_string(gs) for i, gs in enumerate(config.geometries)
+              if (i % config.stride) == 0]
+    molecules = [mol.to_atoms() for mol in arrays]
+    molecules_au = [MolArrays(symbols, coords * angs2au).to_atoms()
+                    for symbols, coords in arrays]
+
+    # Compute in a single batch the dipole matrices missing in the HDF5
+    precompute_multipole_matrices(
+        config, [DictConfig({'i': i * config.stride, 'mol': mol})
+                 for i, mol in enumerate(molecules)], 'dipole')
+
+    if config.parallel_backend == 'threads':
+        # A single noodles job computing all the frames in a pool of threads
+        results = schedule(compute_excited_states_in_threads)(
+            config, mo_paths_hdf5, molecules_au)
+    else:
+        # Noodles promised call
+        scheduleTDDFT = schedule(compute_excited_states_tddft)
 
-    results = gather(
-        *[scheduleTDDFT(config, mo_paths_hdf5[i], DictConfig(
-            {'i': i * config.stride, 'mol': mol}))
-          for i, mol in enumerate(molecules_au)])
+        results = gather(
+            *[scheduleTDDFT(config, mo_paths_hdf5[i], DictConfig(
+                {'i': i * config.stride, 'mol': mol}))
+              for i, mol in enumerate(molecules_au)])
 
     run(gather(results, energy_paths_hdf5), folder=config['workdir'])
 
 
+def compute_excited_states_in_threads(
+        config: DictConfig, mo_paths_hdf5: List[List[str]],
+        molecules_au: List[MolXYZ]) -> None:
+    """Compute the excited states of all the frames using a pool of threads.
+
+    The work for each frame is dominated by BLAS/LAPACK calls that release the GIL,
+    therefore the frames run concurrently without spawning a noodles job for each
+    of them. The access to the HDF5 is serialized with :data:`HDF5_LOCK`.
+
+    The pool shares the cores with the BLAS threads, see :func:`blas_thread_count`.
+    If their number is unknown, BLAS is assumed to use all the cores and only two
+    workers are used.
+    """
+    blas_threads = blas_thread_count()
+    cpus = os.cpu_count() or 1
+    if blas_threads is None:
+        max_workers = min(2, cpus)
+    else:
+        max_workers = max(1, cpus // blas_threads)
+    inputs = [DictConfig({'i': i * config.stride, 'mol': mol})
+              for i, mol in enumerate(molecules_au)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(compute_excited_states_tddft, config, mo_paths_hdf5[i], inp)
+                   for i, inp in enumerate(inputs)]
+        for future in futures:
+            future.result()
+
+
+def blas_thread_count() -> Optional[int]:
+    """Return the number of threads used by BLAS or ``None`` if it is unknown.
+
+    ``OMP_NUM_THREADS`` takes precedence. Only its first field is used, since OpenMP
+    accepts a comma separated list with the threads of each nesting level, and
+    invalid values count as a single thread. Otherwise the number is queried with
+    `threadpoolctl <https://github.com/joblib/threadpoolctl>`_, if it is installed.
+    """
+    omp_threads = os.environ.get("OMP_NUM_THREADS")
+    if omp_threads is not None:
+        try:
+            return max(1, int(omp_threads.split(",")[0]))
+        except ValueError:
+            return 1
+
+    try:
+        from threadpoolctl import threadpool_info
+    except ImportError:
+        return None
+    counts = [info["num_threads"] for info in threadpool_info() if info["user_api"] == "blas"]
+    return max(counts) if counts else None
+
+
 def compute_excited_states_tddft(
-        config: DictConfig, path_MOs: PathLike, dict_input: DictConfig) -> None:
+        config: DictConfig, path_MOs: List[str], dict_input: DictConfig) -> None:
     """Compute the excited states properties (energy and coefficients).
 
     Take a given `mo_index_range`, the `tddft` method and `xc_dft` exchange functional.
     """
     logger.info("Reading energies and mo coefficients")
     # type of calculation
-    energy, c_ao = retrieve_hdf5_data(config.path_hdf5, path_MOs)
+    with HDF5_LOCK:
+        energy, c_ao = retrieve_hdf5_data(config.path_hdf5, path_MOs)
 
     # Number of virtual orbitals
     nocc = config.active_space[0]
@@ -78,7 +149,7 @@ def compute_excited_states_tddft(
     copy_dict["mol"] = change_mol_units(dict_input["mol"], factor=1/angs2au)
 
     # compute the multipoles if they are not stored
-    multipoles = get_multipole_matrix(config, copy_dict, 'dipole')
+    multipoles = get_multipole_matrix(config, copy_dict, 'dipole', lock=HDF5_LOCK)
 
     # read data from the HDF5 or calculate it on the fly
     dict_input["overlap"] = multipoles[0]
@@ -118,16 +189,18 @@ def get_omega_xia(
                 'point_{}'.format(dict_input.i + config.enumerate_from))
     paths_omega_xia = [join(root, x) for x in ("omega", "xia")]
 
-    if is_data_in_hdf5(config.path_hdf5, paths_omega_xia):
-        return tuple(retrieve_hdf5_data(config.path_hdf5, paths_omega_xia))
-    else:
-        omega, xia = compute_omega_xia()
+    with HDF5_LOCK:
+        if is_data_in_hdf5(config.path_hdf5, paths_omega_xia):
+            return tuple(retrieve_hdf5_data(config.path_hdf5, paths_omega_xia))
+
+    omega, xia = compute_omega_xia()
+    with HDF5_LOCK:
         store_arrays_in_hdf5(
             config.path_hdf5, paths_omega_xia[0], omega, dtype=omega.dtype)
         store_arrays_in_hdf5(
             config.path_hdf5, paths_omega_xia[1], xia, dtype=xia.dtype)
 
-        return omega, xia
+    return omega, xia
 
 
 def compute_sing_orb(inp: DictConfig) -> Tuple[np.ndarray, np.ndarray]:
@@ -201,33 +274,24 @@ def compute_oscillator_strengths(config: DictConfig, inp: DictConfig) -> None:
         inp.energy[:inp.nocc].reshape(inp.nocc, 1),
         inp.energy[inp.nocc:].reshape(inp.nvirt, 1).T).reshape(inp.nocc * inp.nvirt)
 
-    def compute_transition_matrix(matrix):
-        if tddft == 'sing_orb':
-            tm = np.stack(
-                [np.sum(
-                 delta_ia / inp.omega[i] * inp.xia[:, i] * matrix)
-                 for i in range(inp.nocc * inp.nvirt)])
-        else:
-            tm = np.stack(
-                [np.sum(
-                 np.sqrt(2 * delta_ia / inp.omega[i]) * inp.xia[:, i] * matrix)
-                 for i in range(inp.nocc * inp.nvirt)])
-        return tm
+    # Weights of each i->a transition (rows) in every excited state (columns)
+    if tddft == 'sing_orb':
+        weights = delta_ia[:, None] / inp.omega[None, :] * inp.xia
+    else:
+        weights = np.sqrt(2 * delta_ia[:, None] / inp.omega[None, :]) * inp.xia
 
     # 2) Compute the transition dipole matrix TDM(i->a)
     # Call the function that computes transition dipole moments integrals
     logger.info("Reading or computing the transition dipole matrix")
 
-    def compute_tdmatrix(k):
-        return np.linalg.multi_dot(
-            [inp.c_ao[:, :inp.nocc].T, inp.multipoles[k, :, :],
-             inp.c_ao[:, inp.nocc:]]).reshape(inp.nocc*inp.nvirt)
-
-    td_matrices = (compute_tdmatrix(k) for k in range(3))
+    # Contract the three cartesian components at once using a broadcasted
+    # matrix product over the stack of dipole matrices
+    td_matrices = np.matmul(
+        inp.c_ao[:, :inp.nocc].T, inp.multipoles[:3] @ inp.c_ao[:, inp.nocc:]
+    ).reshape(3, inp.nocc * inp.nvirt)
 
     # 3) Compute the transition dipole moments for each excited state i->a. Size: n_exc_states
-    d_x, d_y, d_z = tuple(
-        compute_transition_matrix(m) for m in td_matrices)
+    d_x, d_y, d_z = td_matrices @ weights
 
     # 4) Compute the oscillator strength
     f = 2 / 3 * inp.omega * (d_x ** 2 + d_y ** 2 + d_z ** 2)
@@ -344,7 +408,7 @@ def get_omega(d0I_ao, s, n_lowest):
 
 def get_r_ab(mol):
     """TODO: add Documentation."""
-    coords = np.asarray([atom[1] for atom in mol])
+    coords = MolArrays.from_atoms(mol).coords
     # Distance matrix between atoms A and B
     r_ab = cdist(coords, coords)
     return r_ab
@@ -354,26 +418,20 @@ def get_omega_ab(d0I_ao, s, n_lowest, mol, config):
     """TODO: add Documentation."""
     # Lowdin transformation of the transition density matrix
     n_atoms = len(mol)
-    s_sqrt = sqrtm(s)
+    s_sqrt = sqrt_symmetric_matrix(s)
     d0I_mo = np.stack(
         np.linalg.multi_dot([s_sqrt, d0I_ao[i, :, :], s_sqrt]) for i in range(n_lowest))
 
     # Compute the number of spherical functions for each atom
-    n_sph_atoms = number_spherical_functions_per_atom(
-        mol, config['package_name'], config['basis_name'], config['path_hdf5'])
-
-    # Compute omega_ab
-    omega_ab = np.zeros((n_lowest, n_atoms, n_atoms))
-    for i in range(n_lowest):
-        index_a = 0
-        for a in range(n_atoms):
-            index_b = 0
-            for b in range(n_atoms):
-                omega_ab[i, a, b] = np.sum(
-                    d0I_mo[i, index_a:(index_a + n_sph_atoms[a]),
-                           index_b:(index_b + n_sph_atoms[b])] ** 2)
-                index_b += n_sph_atoms[b]
-            index_a += n_sph_atoms[a]
+    with HDF5_LOCK:
+        n_sph_atoms = number_spherical_functions_per_atom(
+            mol, config['package_name'], config['basis_name'], config['path_hdf5'])
+
+    # Compute omega_ab adding up the squared elements of each pair of atomic blocks
+    indices = np.zeros(n_atoms, dtype=int)
+    indices[1:] = np.cumsum(n_sph_atoms[:-1])
+    omega_ab = np.add.reduceat(
+        np.add.reduceat(d0I_mo ** 2, indices, axis=1), indices, axis=2)
 
     return omega_ab
 
@@ -413,9 +471,6 @@ def write_output_tddft(inp: DictConfig) -> np.ndarray:
     """Write out as a table in plane text."""
     energy = inp.energy
 
-    excs = [(i, a) for i in range(inp.nocc)
-            for a in range(inp.nocc, inp.nvirt + inp.nocc)]
-
     output = np.empty((inp.nocc * inp.nvirt, 12))
     output[:, 0] = 0  # State number: we update it after reorder
     output[:, 1] = inp.omega * h2ev  # State energy in eV
@@ -426,24 +481,19 @@ def write_output_tddft(inp: DictConfig) -> np.ndarray:
     output[:, 4] = d_y  # Transition dipole moment in the y direction
     output[:, 5] = d_z  # Transition dipole moment in the z direction
     # Weight of the most important excitation
-    output[:, 6] = np.hstack([np.max(inp.xia[:, i] ** 2)
-                              for i in range(inp.nocc * inp.nvirt)])
+    xia_squared = inp.xia ** 2
+    output[:, 6] = np.max(xia_squared, axis=0)
 
     # Find the index of this transition
-    index_weight = np.hstack([
-        np.where(
-            inp.xia[:, i] ** 2 == np.max(
-                inp.xia[:, i] ** 2))
-        for i in range(inp.nocc * inp.nvirt)]).reshape(inp.nocc * inp.nvirt)
+    index_weight = np.argmax(xia_squared, axis=0)
+    index_hole, index_electron = np.divmod(index_weight, inp.nvirt)
 
     # Index of the hole for the most important excitation
-    output[:, 7] = np.stack([excs[index_weight[i]][0]
-                             for i in range(inp.nocc * inp.nvirt)]) + 1
+    output[:, 7] = index_hole + 1
     # These are the energies of the hole for the transition with the larger weight
-    output[:, 8] = energy[output[:, 7].astype(int) - 1] * h2ev
+    output[:, 8] = energy[index_hole] * h2ev
     # Index of the electron for the most important excitation
-    output[:, 9] = np.stack([excs[index_weight[i]][1]
-                             for i in range(inp.nocc * inp.nvirt)]) + 1
+    output[:, 9] = index_electron + inp.nocc + 1
     # These are the energies of the electron for the transition with the larger weight
     output[:, 10] = energy[output[:, 9].astype(int) - 1] * h2ev
     # This is the energy for the transition with the larger weight
@@ -461,12 +511,14 @@ def write_output_tddft(inp: DictConfig) -> np.ndarray:
 def transition_density_charges(mol, config, s, c_ao):
     """TODO: add Documentation."""
     n_atoms = len(mol)
-    sqrt_s = sqrtm(s)
+    sqrt_s = sqrt_symmetric_matrix(s)
     c_mo = np.dot(sqrt_s, c_ao)
     # Size of the transition density tensor : n_atoms x n_mos x n_mos
     q = np.zeros((n_atoms, c_mo.shape[1], c_mo.shape[1]))
-    n_sph_atoms = number_spherical_functions_per_atom(
-        mol, config['package_name'], config.cp2k_general_settings['basis'], config['path_hdf5'])
+    with HDF5_LOCK:
+        n_sph_atoms = number_spherical_functions_per_atom(
+            mol, config['package_name'], config.cp2k_general_settings['basis'],
+            config['path_hdf5'])
 
     index = 0
     for i in range(n_atoms):
@@ -482,15 +534,17 @@ def compute_MNOK_integrals(mol, xc_dft):
     n_atoms = len(mol)
     r_ab = get_r_ab(mol)
     hardness_vec = np.stack([hardness(m[0]) for m in mol]).reshape(n_atoms, 1)
-    print("hardness: ", [m[0].capitalize() for m in mol])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("hardness: %s", [m[0].capitalize() for m in mol])
     hard = np.add(hardness_vec, hardness_vec.T)
-    beta = xc(xc_dft)['beta1'] + xc(xc_dft)['ax'] * xc(xc_dft)['beta2']
-    alpha = xc(xc_dft)['alpha1'] + xc(xc_dft)['ax'] * xc(xc_dft)['alpha2']
-    if (xc(xc_dft)['type'] == 'pure'):
+    functional = xc(xc_dft)
+    beta = functional['beta1'] + functional['ax'] * functional['beta2']
+    alpha = functional['alpha1'] + functional['ax'] * functional['alpha2']
+    if (functional['type'] == 'pure'):
         gamma_J = np.zeros((n_atoms, n_atoms))
     else:
         gamma_J = np.power(
-            1 / (np.power(r_ab, beta) + np.power((xc(xc_dft)['ax'] * hard), -beta)), 1/beta)
+            1 / (np.power(r_ab, beta) + np.power((functional['ax'] * hard), -beta)), 1/beta)
     gamma_K = np.power(1 / (np.power(r_ab, alpha) +
                             np.power(hard, -alpha)), 1/alpha)
 
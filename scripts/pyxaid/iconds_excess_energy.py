@@ -45,12 +45,12 @@ def main(path_output, nstates, iconds, excess, delta, cool):
         for i in range(len(iconds))]
 
     # Print the states
-    t = 'Time Init Cond    List with State Indexes\n'
-    for i in range(len(iconds)):
-        t += f' {iconds[i]}           {indexes[i][0] + 1}\n'
+    lines = ['Time Init Cond    List with State Indexes\n']
+    lines.extend(f' {icond}           {index[0] + 1}\n'
+                 for icond, index in zip(iconds, indexes))
 
     with open('initial_conditions.out', 'w') as f:
-        f.write(t)
+        f.writelines(lines)
 
 
 def read_cmd_line(parser):
@@ -138,13 +138,13 @@ def store_coordination(coord: NestedDict, name: str, path_results: str):
     tuple_generator = ((outerKey, innerKey, values) for outerKey, innerDict in coord.items()
                        for innerKey, values in innerDict.items())
 
-    t = 'Atom  #Coord  List      Indices\n'
-    for i, v in enumerate(tuple_generator, start=1):
-        t += f'{v[0]}     {v[1]}      "list{i}"     {v[2]}\n'
+    lines = ['Atom  #Coord  List      Indices\n']
+    lines.extend(f'{v[0]}     {v[1]}      "list{i}"     {v[2]}\n'
+                 for i, v in enumerate(tuple_generator, start=1))
 
     path_ldos = f"{path_results}/{name}"
     with open(f"{path_ldos}/coord_lists.out", 'w') as f:
-        f.write(t)
+        f.writelines(lines)
 
 
 def main(workdir: str):
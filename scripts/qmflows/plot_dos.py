@@ -20,6 +20,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import interactive
 
+from nanoqm.analysis import convolute
+
 
 def readatom(filename):
     # In the first line in column 6, the atom is defined
@@ -28,19 +30,6 @@ def readatom(filename):
     return atom
 
 
-def g(x_real, x_grid, delta):
-    return np.exp(-2 * (x_grid - x_real) ** 2 / delta ** 2)
-
-
-def convolute(x, y, x_points, sigma):
-    # Compute gaussian prefactor
-    prefactor = np.sqrt(2.0) / (sigma * np.sqrt(np.pi))
-    # Convolute spectrum over grid
-    y_points = prefactor * np.stack(
-        np.sum(y * g(x, x_point, sigma)) for x_point in x_points)
-    return y_points
-
-
 def plot_stuff(ys, energies, legends, emin, emax):
     # In case you need more colors, this list should be expanded
     colors = ['black', 'orange', 'blue', 'red',
@@ -93,23 +82,20 @@ def main(group, emin, emax):
     # Define the atom type for each DOS file
     legends = [readatom(files[i]) for i in range(len(files))]
     print(files, legends)
-    # MO energies
-    energies = np.loadtxt(files[0], usecols=1)
-    # Convert energies to eV
-    energies *= 27.211
+    # Read (only once) the files with PDOS info
+    xs = [np.loadtxt(fn) for fn in files]
+    # MO energies converted to eV
+    energies = xs[0][:, 1] * 27.211
     # Occupation
-    occ = np.loadtxt(files[0], usecols=2)
+    occ = xs[0][:, 2]
     lumos_indx = np.where(occ == 0)
     lumo_indx = lumos_indx[0][0]
     homo_indx = lumo_indx - 1
     hl_gap = (energies[lumo_indx] - energies[homo_indx])
     print(f'The homo-lumo gap is: {hl_gap} eV')
 
-    # Read Files with PDOS info
-    xs = [np.loadtxt(files[i]) for i in range(len(files))]
     # Add up all orbitals contribution for each atom type
-    ys = np.stack(np.sum(xs[i][:, 3:], axis=1)
-                  for i in range(len(files))).transpose()
+    ys = np.stack([np.sum(x[:, 3:], axis=1) for x in xs], axis=1)
 
     if group:
         lig_atoms = 0
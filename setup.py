@@ -149,7 +149,7 @@ setup(
     ],
     install_requires=[
         'h5py', 'mendeleev', 'more-itertools', 'noodles==0.3.3', 'numpy', 'pybind11>=2.2.4',
-        'scipy', 'schema', 'pyyaml>=5.1',
+        'scipy', 'schema', 'pyyaml>=5.1', 'importlib_resources; python_version<"3.9"',
         'plams@git+https://github.com/SCM-NV/PLAMS@master',
         'qmflows@git+https://github.com/SCM-NV/qmflows@master'
     ],
@@ -1,5 +1,4 @@
 """Test he absorption spectrum workflows."""
-import shutil
 from pathlib import Path
 
 import numpy as np
@@ -17,8 +16,6 @@ def test_compute_oscillators(tmp_path):
     project_name = 'Cd'
     path_original_hdf5 = PATH_TEST / 'Cd.hdf5'
 
-    # create scratch path
-    shutil.copy(path_original_hdf5, tmp_path)
     for approx in ("sing_orb", "stda"):
         try:
             # Run the actual test
@@ -47,9 +44,9 @@ def calculate_oscillators(path_test_hdf5: PathLike, scratch_path: PathLike, appr
 def check_properties(path_test_hdf5):
     """Check that the tensor stored in the HDF5 are correct."""
     dipole_matrices = retrieve_hdf5_data(
-        path_test_hdf5, 'Cd/multipole/point_0/dipole')
+        path_test_hdf5, 'Cd/multipole/dipole')[0]
 
     # The diagonals of each component of the matrix must be zero
     # for a single atom
-    diagonals = np.sum([np.diag(dipole_matrices[n + 1]) for n in range(3)])
-    assert abs(diagonals) < 1e-16
+    diagonals = np.diagonal(dipole_matrices[1:], axis1=1, axis2=2)
+    assert np.allclose(diagonals, 0, rtol=0, atol=1e-16)
@@ -5,7 +5,7 @@ from typing import Sequence
 
 import numpy as np
 
-from nanoqm.common import DictConfig, is_data_in_hdf5, retrieve_hdf5_data
+from nanoqm.common import DictConfig, is_data_in_hdf5, retrieve_hdf5_tensor
 from nanoqm.workflows.input_validation import process_input
 from nanoqm.workflows.workflow_coupling import workflow_derivative_couplings
 
@@ -64,16 +64,14 @@ def check_couplings(config: DictConfig, tmp_hdf5: str, orbitals_type: str) -> No
     couplings = create_paths('coupling')
 
     # Check that couplings and overlaps exists
-    assert is_data_in_hdf5(tmp_hdf5, overlaps)
-    assert is_data_in_hdf5(tmp_hdf5, couplings)
+    assert is_data_in_hdf5(tmp_hdf5, overlaps + couplings)
 
     # All the elements are different of inifinity or nan
-    tensor_couplings = np.stack(retrieve_hdf5_data(tmp_hdf5, couplings))
+    tensor_couplings = retrieve_hdf5_tensor(tmp_hdf5, couplings)
     assert np.isfinite(tensor_couplings).all()
 
     # Check that the couplings are anti-symetric
-    for mtx in tensor_couplings[:]:
-        assert np.allclose(mtx, -mtx.T)
+    assert np.allclose(tensor_couplings, -tensor_couplings.swapaxes(1, 2))
 
     # Check that there are not NaN
     assert (not np.all(np.isnan(tensor_couplings)))
@@ -89,4 +87,5 @@ def check_hamiltonians(hamiltonians: Sequence[str]) -> None:
     assert np.isfinite(couplings).all()
 
     # Check that the couplings diagonal is zero
-    assert abs(np.einsum('jii->', couplings)) < 1e-16
+    diagonals = np.diagonal(couplings, axis1=1, axis2=2)
+    assert np.allclose(diagonals, 0, rtol=0, atol=1e-16)
@@ -2,11 +2,15 @@
 
 from pathlib import Path
 
+import h5py
 import numpy as np
 from assertionlib import assertion
 from qmflows.parsers.xyzParser import readXYZ
 
-from nanoqm.integrals.multipole_matrices import compute_matrix_multipole
+from nanoqm.integrals.multipole_matrices import (compute_matrix_multipole,
+                                                 copy_legacy_multipoles,
+                                                 get_overlap_matrix,
+                                                 search_multipole_in_hdf5)
 from nanoqm.workflows.input_validation import process_input
 
 from .utilsTest import PATH_TEST, copy_basis_and_orbitals
@@ -32,3 +36,40 @@ def test_quadropole(tmp_path):
     for i in range(10):
         arr = matrix[i].reshape(46, 46)
         assertion.truth(np.allclose(arr, arr.T))
+
+
+def test_overlap_cache(tmp_path):
+    """Check that the stored overlap is only reused for the same geometry."""
+    file_path = PATH_TEST / "input_test_single_points.yml"
+    config = process_input(file_path, 'single_points')
+    path_test_hdf5 = (Path(tmp_path) / "overlap.hdf5").as_posix()
+    copy_basis_and_orbitals(config.path_hdf5, path_test_hdf5, config.project_name)
+    config.path_hdf5 = path_test_hdf5
+
+    mol = readXYZ((PATH_TEST / "ethylene.xyz").as_posix())
+    overlap = get_overlap_matrix(config, mol)
+    assertion.truth(np.array_equal(overlap, get_overlap_matrix(config, mol)))
+
+    # Displace the first atom
+    atom = mol[0]
+    displaced = [atom._replace(xyz=[x + 0.1 for x in atom.xyz])] + mol[1:]
+    get_overlap_matrix(config, displaced)
+    with h5py.File(path_test_hdf5, 'r') as f5:
+        assertion.len_eq(f5[f"{config.project_name}/overlap"], 2)
+
+
+def test_legacy_multipoles(tmp_path):
+    """Check that the multipoles stored with a dataset per point are not recomputed."""
+    path_hdf5 = (Path(tmp_path) / "legacy.hdf5").as_posix()
+    path_dipole = "ethylene/multipole/dipole"
+    dipole = np.random.default_rng(0).random((4, 46, 46)).astype(np.float32)
+    with h5py.File(path_hdf5, 'w') as f5:
+        f5["ethylene/multipole/point_2/dipole"] = dipole
+
+    copy_legacy_multipoles(path_hdf5, [path_dipole], [0, 2])
+    assertion.eq(search_multipole_in_hdf5(path_hdf5, path_dipole, "dipole", 0), None)
+    stored = search_multipole_in_hdf5(path_hdf5, path_dipole, "dipole", 2)
+    assertion.truth(np.array_equal(stored, dipole))
+    overlap = search_multipole_in_hdf5(
+        path_hdf5, "ethylene/multipole/overlap", "overlap", 2)
+    assertion.truth(np.array_equal(overlap, dipole[0]))
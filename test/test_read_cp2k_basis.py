@@ -2,19 +2,19 @@
 from pathlib import Path
 
 import h5py
-import pkg_resources
 from qmflows.type_hints import PathLike
 
 from nanoqm.workflows.initialization import store_cp2k_basis
 
+from .utilsTest import PATH_NANOQM
+
 
 def test_read_cp2k_basis(tmp_path: PathLike) -> None:
     """Read Basis set in CP2K format."""
     tmp_hdf5 = Path(tmp_path) / 'cp2k_basis.hdf5'
     tmp_hdf5.touch()
 
-    path_basis = pkg_resources.resource_filename(
-        "nanoqm", "basis/BASIS_MOLOPT")
+    path_basis = (PATH_NANOQM / "basis" / "BASIS_MOLOPT").as_posix()
 
     coefficients_format_carbon_DZVP_MOLOPT_GTH = '[2, 0, 2, 7, 2, 2, 1]'
     store_cp2k_basis(tmp_hdf5, path_basis)
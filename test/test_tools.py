@@ -1,8 +1,15 @@
 """Test the workflows tools."""
+import h5py
 import numpy as np
+import pytest
 from qmflows.parsers import parse_string_xyz
 
-from nanoqm.common import number_spherical_functions_per_atom
+from nanoqm.analysis import convolute, convolute_fft, func_conv
+from nanoqm.analysis.tools import MIN_SIGMA_STEPS
+from nanoqm.common import (MolArrays, angs2au, change_mol_units, is_data_in_hdf5,
+                           is_hdf5_empty, number_spherical_functions_per_atom,
+                           retrieve_hdf5_data, retrieve_hdf5_tensor,
+                           sqrt_symmetric_matrix, store_arrays_in_hdf5)
 
 from .utilsTest import PATH_TEST
 
@@ -18,3 +25,132 @@ def test_calc_sphericals():
     expected = np.concatenate((np.repeat(25, 33), np.repeat(13, 33)))
 
     assert np.array_equal(xs, expected)
+
+
+def test_mol_arrays_from_string():
+    """Test the vectorized parsing of the XYZ geometries."""
+    with open(PATH_TEST / 'Cd33Se33.xyz', 'r') as f:
+        xs = f.read()
+    mol = parse_string_xyz(xs)
+
+    assert MolArrays.from_string(xs).to_atoms() == mol
+    arrays_au = MolArrays.from_string(xs, factor=angs2au)
+    assert np.allclose(arrays_au.coords, MolArrays.from_atoms(mol).coords * angs2au)
+
+
+def test_change_mol_units():
+    """Test the conversion of the molecular coordinates."""
+    with open(PATH_TEST / 'Cd33Se33.xyz', 'r') as f:
+        mol = parse_string_xyz(f.read())
+    mol_au = change_mol_units(mol)
+
+    arrays = MolArrays.from_atoms(mol)
+    arrays_au = MolArrays.from_atoms(mol_au)
+    assert arrays_au.to_atoms() == mol_au
+    assert np.array_equal(arrays.symbols, arrays_au.symbols)
+    assert np.allclose(arrays.coords * angs2au, arrays_au.coords)
+
+
+def test_retrieve_hdf5_tensor(tmp_path):
+    """Check that the arrays are read into a single tensor."""
+    path_hdf5 = tmp_path / "tensor.hdf5"
+    h5py.File(path_hdf5, 'w').close()
+    paths = [f"overlaps_{i}" for i in range(3)]
+    store_arrays_in_hdf5(path_hdf5, paths, np.random.rand(3, 5, 5))
+
+    tensor = retrieve_hdf5_tensor(path_hdf5, paths)
+    assert tensor.shape == (3, 5, 5)
+    assert tensor.dtype == np.float32
+    assert np.array_equal(tensor, np.stack(retrieve_hdf5_data(path_hdf5, paths)))
+
+
+def test_is_data_in_empty_hdf5(tmp_path):
+    """Check that a missing or zero-byte HDF5 contains no data."""
+    path_hdf5 = tmp_path / "empty.hdf5"
+    assert is_hdf5_empty(path_hdf5)
+    path_hdf5.touch()
+    assert is_hdf5_empty(path_hdf5)
+    assert not is_data_in_hdf5(path_hdf5, "cp2k/basis")
+
+    h5py.File(path_hdf5, 'w').close()
+    assert not is_hdf5_empty(path_hdf5)
+    assert not is_data_in_hdf5(path_hdf5, ["cp2k/basis"])
+
+
+def test_sqrt_symmetric_matrix():
+    """Test the square root of a symmetric positive definite matrix."""
+    rng = np.random.default_rng(42)
+    arr = rng.uniform(-1, 1, (20, 20))
+    matrix = arr @ arr.T + np.eye(20)
+    root = sqrt_symmetric_matrix(matrix)
+
+    assert np.allclose(root, root.T)
+    assert np.allclose(root @ root, matrix)
+
+
+def test_convolute():
+    """Test the convolution of a stick spectrum on a grid."""
+    rng = np.random.default_rng(42)
+    x = rng.uniform(1, 4, 50)
+    y = rng.uniform(0, 1, 50)
+    x_grid = np.linspace(0, 5, 200)
+    sigma = 0.1
+
+    prefactor = np.sqrt(2.0) / (sigma * np.sqrt(np.pi))
+    expected = prefactor * np.array(
+        [np.sum(y * func_conv(x, x_point, sigma)) for x_point in x_grid])
+
+    assert np.allclose(convolute(x, y, x_grid, sigma), expected)
+
+
+def test_convolute_fft():
+    """Test the FFT convolution against the direct evaluation."""
+    rng = np.random.default_rng(42)
+    x = rng.uniform(-0.5, 5.5, 500)
+    y = rng.uniform(0, 1, 500)
+    x_grid = np.linspace(0, 5, 1001)
+    expected = convolute(x, y, x_grid, 0.1)
+
+    ys = convolute_fft(x, y, x_grid, 0.1)
+    assert np.allclose(ys, expected, atol=1e-3 * expected.max())
+
+    # Gaussians narrower than a few grid steps are evaluated directly
+    x_coarse = np.linspace(0, 5, 50)
+    assert np.allclose(convolute_fft(x, y, x_coarse, 0.05), convolute(x, y, x_coarse, 0.05))
+
+    with pytest.raises(ValueError):
+        convolute_fft(x, y, np.geomspace(1, 5, 100), 0.1)
+    with pytest.raises(ValueError):
+        convolute_fft(x, y, x_grid, 0.0)
+    with pytest.raises(ValueError):
+        convolute_fft(x, y, x_grid[:1], 0.1)
+
+
+def test_convolute_fft_variable_width():
+    """Test the FFT convolution using a different broadening per stick."""
+    rng = np.random.default_rng(42)
+    x = rng.uniform(0, 5, 200)
+    y = rng.uniform(0, 1, 200)
+    sigmas = rng.uniform(0.05, 0.3, 200)
+    x_grid = np.linspace(0, 5, 1001)
+    expected = sum(convolute(np.array([xi]), np.array([yi]), x_grid, si)
+                   for xi, yi, si in zip(x, y, sigmas))
+
+    ys = convolute_fft(x, y, x_grid, sigmas, rtol=0.01)
+    assert np.allclose(ys, expected, atol=1e-3 * expected.max())
+
+
+def test_convolute_fft_narrowest_width():
+    """Test the FFT convolution when the narrowest Gaussian is at the binning limit."""
+    rng = np.random.default_rng(42)
+    x = rng.uniform(0, 10, 500)
+    y = rng.uniform(0, 1, 500)
+    x_grid = np.linspace(0, 10, 2001)
+    step = x_grid[1] - x_grid[0]
+    sigmas = rng.uniform(MIN_SIGMA_STEPS * step, 1, 500)
+    sigmas[0] = MIN_SIGMA_STEPS * step
+    kernel = func_conv(x[np.newaxis, :], x_grid[:, np.newaxis], sigmas[np.newaxis, :])
+    expected = kernel @ (np.sqrt(2 / np.pi) / sigmas * y)
+
+    ys = convolute_fft(x, y, x_grid, sigmas)
+    assert np.allclose(ys, expected, atol=1e-2 * expected.max())
@@ -1,19 +1,23 @@
 """Functions use for testing."""
+import atexit
 import fnmatch
+import hashlib
 import os
 import shutil
-from distutils.spawn import find_executable
+import tempfile
+from functools import lru_cache
+from importlib.util import find_spec
 from os.path import join
 from pathlib import Path
 
 import h5py
-import pkg_resources as pkg
 from qmflows.type_hints import PathLike
 
 __all__ = ["PATH_NANOQM", "PATH_TEST", "copy_basis_and_orbitals", "cp2k_available", "remove_files"]
 
 # Environment data
-PATH_NANOQM = Path(pkg.resource_filename('nanoqm', ''))
+# Locate the package without importing it
+PATH_NANOQM = Path(find_spec('nanoqm').origin).parent
 ROOT = PATH_NANOQM.parent
 PATH_TEST = ROOT / "test" / "test_files"
 
@@ -30,21 +34,60 @@ def remove_files() -> None:
 
 def cp2k_available(executable: str = "cp2k.popt") -> bool:
     """Check if cp2k is installed."""
-    path = find_executable(executable)
+    path = shutil.which(executable)
 
     return path is not None
 
 
 def copy_basis_and_orbitals(source: PathLike, dest, project_name: PathLike) -> None:
+    """Copy the Orbitals and the basis set from one the HDF5 to another.
+
+    The trimmed HDF5 is created only once per test session for each source file,
+    identified by its path, size and modification time, and then copied as a file.
+    Set the ``NANOQM_DISABLE_TEST_CACHE`` environment variable to a non-empty value,
+    e.g. in CI, to trim the source again for every call.
+    """
+    if os.environ.get("NANOQM_DISABLE_TEST_CACHE"):
+        _copy_basis_and_orbitals(source, dest, project_name)
+        return
+
+    source = Path(source).resolve()
+    stat = source.stat()
+    cached = _cached_basis_and_orbitals(
+        source.as_posix(), str(project_name), stat.st_size, stat.st_mtime_ns)
+    shutil.copyfile(cached, dest)
+
+
+@lru_cache(maxsize=None)
+def _test_cache_dir() -> str:
+    """Create the folder holding the cached HDF5 files, removed at exit."""
+    path = tempfile.mkdtemp(prefix="nanoqm_test_cache_")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+@lru_cache(maxsize=None)
+def _cached_basis_and_orbitals(source: str, project_name: str, size: int, mtime: int) -> str:
+    """Create (only once per source, project, size and modification time) the trimmed HDF5."""
+    key = hashlib.sha1(f"{source}:{project_name}:{size}:{mtime}".encode()).hexdigest()
+    dest = join(_test_cache_dir(), f"{project_name}_{key}.hdf5")
+    _copy_basis_and_orbitals(source, dest, project_name)
+    return dest
+
+
+def _copy_basis_and_orbitals(source: PathLike, dest, project_name: PathLike) -> None:
     """Copy the Orbitals and the basis set from one the HDF5 to another."""
     keys = [project_name, 'cp2k']
     excluded = ['multipole', 'coupling', 'dipole_matrices',
                 'overlaps', 'swaps', 'omega_xia']
     with h5py.File(source, 'r') as f5, h5py.File(dest, 'w') as g5:
         for k in keys:
-            if k not in g5:
-                g5.create_group(k)
-            for label in f5[k].keys():
-                if not any(x in label for x in excluded):
-                    path = join(k, label)
-                    f5.copy(path, g5[k])
+            labels = list(f5[k].keys())
+            selected = [label for label in labels if not any(x in label for x in excluded)]
+            if len(selected) == len(labels):
+                # Copy the whole group at once
+                f5.copy(k, g5)
+                continue
+            g5.create_group(k)
+            for label in selected:
+                f5.copy(join(k, label), g5[k])